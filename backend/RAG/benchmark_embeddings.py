@@ -0,0 +1,106 @@
+"""
+Throughput / recall-drift benchmark for the embedding backends.
+
+Usage (from backend/):
+    python -m RAG.benchmark_embeddings --pdf Coimbatore.pdf --backends torch,int8,onnx
+
+For every backend it reports docs/s over the PDF's chunks, the mean cosine
+similarity of its vectors to the "torch" baseline, and recall@k of
+nearest-neighbour search compared with the baseline.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from RAG.chunking import DocumentChunker
+from RAG.loadPDF import PDFProcessor
+from models import load_sentence_transformer
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    scores = _normalise(queries) @ _normalise(corpus).T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _encode(model, texts: List[str], batch_size: int) -> Dict[str, object]:
+    # One untimed pass so lazy initialisation is not counted
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True)
+
+    started = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - started
+
+    return {"vectors": np.asarray(vectors, dtype=np.float32), "docs_per_s": len(texts) / elapsed}
+
+
+def run(pdf: Path, backends: List[str], model_name: str, batch_size: int, k: int, max_tokens: int):
+    docs = PDFProcessor(pdf).load()
+    chunks = DocumentChunker(max_tokens=max_tokens, chunk_overlap=max_tokens // 8).chunk(docs)
+    texts = [c.page_content for c in chunks]
+
+    # First ~200 chars of each chunk act as queries for the recall check
+    queries = [t[:200] for t in texts]
+    k = min(k, len(texts))
+
+    print(f"{len(texts)} chunks from {pdf} | model {model_name} | batch {batch_size} | recall@{k}")
+
+    baseline = None
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        model = load_sentence_transformer(model_name, backend)
+        result = _encode(model, texts, batch_size)
+        query_vectors = np.asarray(
+            model.encode(queries, batch_size=batch_size, convert_to_numpy=True),
+            dtype=np.float32,
+        )
+        neighbours = _top_k(query_vectors, result["vectors"], k)
+
+        if baseline is None:
+            baseline = {"vectors": result["vectors"], "neighbours": neighbours}
+            drift, recall = 1.0, 1.0
+        else:
+            drift = float(np.mean(np.sum(
+                _normalise(result["vectors"]) * _normalise(baseline["vectors"]), axis=1
+            )))
+            recall = float(np.mean([
+                len(set(a) & set(b)) / k
+                for a, b in zip(neighbours, baseline["neighbours"])
+            ]))
+
+        print(
+            f"{backend:>6}: {result['docs_per_s']:8.1f} docs/s | "
+            f"cosine vs torch {drift:.4f} | recall@{k} vs torch {recall:.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=Path("Coimbatore.pdf"))
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--model", default="BAAI/bge-base-en-v1.5")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    # Small chunks give the benchmark enough documents even for short PDFs
+    parser.add_argument("--max-tokens", type=int, default=128)
+    args = parser.parse_args()
+
+    run(
+        pdf=args.pdf,
+        backends=[b.strip() for b in args.backends.split(",") if b.strip()],
+        model_name=args.model,
+        batch_size=args.batch_size,
+        k=args.k,
+        max_tokens=args.max_tokens,
+    )
+
+
+if __name__ == "__main__":
+    main()
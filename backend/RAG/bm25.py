@@ -0,0 +1,140 @@
+import json
+import re
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from RAG.ingestion_cache import publish_dir
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a compact CSR postings layout.
+
+    For term id t, its postings are doc_ids[indptr[t]:indptr[t+1]] with the
+    matching term frequencies in tfs. Arrays are saved as .npy files and
+    memory-mapped on load, so opening an index costs no rebuild and
+    scoring a query is a handful of vectorised NumPy operations.
+    """
+
+    FILES = ("indptr.npy", "doc_ids.npy", "tfs.npy", "idf.npy", "norm.npy")
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        idf: np.ndarray,
+        norm: np.ndarray,
+        k1: float = 1.5,
+    ):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.norm = norm  # per-doc k1 * (1 - b + b * len / avg_len)
+        self.k1 = k1
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.norm)
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id, tf))
+
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+
+        doc_ids = np.fromiter((d for p in postings for d, _ in p), dtype=np.uint32, count=indptr[-1])
+        tfs = np.fromiter((min(tf, 65535) for p in postings for _, tf in p), dtype=np.uint16, count=indptr[-1])
+
+        n = len(texts)
+        df = np.diff(indptr).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        avg_len = float(doc_len.mean()) if n else 0.0
+        norm = (k1 * (1 - b + b * doc_len / avg_len)) if avg_len else np.full(n, k1, dtype=np.float32)
+
+        return cls(vocab, indptr, doc_ids, tfs, idf, norm.astype(np.float32), k1=k1)
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=path.parent, prefix=".tmp-"))
+
+        try:
+            with open(tmp_dir / "vocab.json", "w", encoding="utf-8") as f:
+                json.dump({"k1": self.k1, "vocab": self.vocab}, f)
+            for name, array in zip(self.FILES, (self.indptr, self.doc_ids, self.tfs, self.idf, self.norm)):
+                np.save(tmp_dir / name, np.asarray(array))
+
+            # Concurrent builds of the same index are identical; the first one wins
+            publish_dir(tmp_dir, path)
+
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BM25Index"]:
+        path = Path(path)
+        if not (path / "vocab.json").exists():
+            return None
+
+        try:
+            with open(path / "vocab.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = [np.load(path / name, mmap_mode="r") for name in cls.FILES]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return cls(meta["vocab"], *arrays, k1=meta["k1"])
+
+    def scores(self, query: str) -> np.ndarray:
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return np.zeros(self.num_docs, dtype=np.float32)
+
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        doc_ids = np.concatenate([self.doc_ids[s] for s in slices])
+        tfs = np.concatenate([self.tfs[s] for s in slices]).astype(np.float32)
+        idf = np.concatenate([np.full(s.stop - s.start, self.idf[t], dtype=np.float32) for s, t in zip(slices, term_ids)])
+
+        weights = idf * tfs * (self.k1 + 1) / (tfs + self.norm[doc_ids])
+        return np.bincount(doc_ids, weights=weights, minlength=self.num_docs).astype(np.float32)
+
+    def top_k(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = top[scores[top] > 0]
+        return top, scores[top]
+
@@ -1,8 +1,18 @@
-from typing import List
+import hashlib
+from typing import Iterable, Iterator, List
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
+def chunk_id(doc_hash: str, page: int, offset: int) -> str:
+    # Stable across runs: same document + same position -> same id
+    return f"{doc_hash[:16]}-p{page}-o{offset}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
 class DocumentChunker:
     def __init__(self, max_tokens: int = 3500, chunk_overlap: int = 200):
         self.chunk_size = max_tokens * 4
@@ -12,10 +22,26 @@ class DocumentChunker:
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             separators=["\n\n", "\n", " ", ""],
+            add_start_index=True,
         )
 
-    def chunk(self, docs: List[Document]) -> List[Document]:
-        chunks = self.text_splitter.split_documents(docs)
+    def iter_chunks(self, docs: Iterable[Document], doc_hash: str) -> Iterator[Document]:
+        # Pages are split independently, so chunks can be yielded as soon as
+        # each page arrives from the loader
+        for doc in docs:
+            page = doc.metadata.get("page", 0)
+
+            for chunk in self.text_splitter.split_documents([doc]):
+                if not chunk.page_content.strip():
+                    continue
+
+                offset = chunk.metadata.pop("start_index", 0)
+                chunk.metadata["chunk_id"] = chunk_id(doc_hash, page, offset)
+                chunk.metadata["content_hash"] = content_hash(chunk.page_content)
+                yield chunk
+
+    def chunk(self, docs: List[Document], doc_hash: str = "") -> List[Document]:
+        chunks = list(self.iter_chunks(docs, doc_hash))
 
         if not chunks:
             raise ValueError("No chunks created")
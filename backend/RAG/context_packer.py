@@ -0,0 +1,155 @@
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+from RAG.bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Tokens of retrieved PDF text allowed into one generator prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}|\n(?=[-•*\d])")
+_NORMALISE_RE = re.compile(r"\W+")
+
+
+@dataclass
+class _Sentence:
+    doc_index: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding: str = CONTEXT_TOKENIZER) -> Optional["tiktoken.Encoding"]:
+    # tiktoken downloads the BPE file on first use; offline workers fall back to an estimate
+    try:
+        return tiktoken.get_encoding(encoding)
+    except Exception as e:
+        logger.warning("Tokenizer %s unavailable (%r); estimating tokens as chars / 4", encoding, e)
+        return None
+
+
+class ContextPacker:
+    """
+    Fits the best parts of the retrieved chunks into a token budget.
+
+    - Sentences repeated across chunks (the splitter's overlap) are dropped
+    - Remaining sentences are scored against the query (idf-weighted overlap)
+    - Highest scoring sentences are taken until the budget is full, then each
+      passage is rendered with its kept sentences in their original order
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, encoding: str = CONTEXT_TOKENIZER):
+        self.token_budget = token_budget
+        self.encoder = get_encoder(encoding)
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoder is None:
+            return max(1, len(text) // 4)
+        return len(self.encoder.encode(text, disallowed_special=()))
+
+    def _windows(self, text: str) -> List[str]:
+        # Consecutive budget-sized cuts of text
+        if self.encoder is None:
+            size = self.token_budget * 4
+            return [text[i : i + size] for i in range(0, len(text), size)]
+        tokens = self.encoder.encode(text, disallowed_special=())
+        return [
+            self.encoder.decode(tokens[i : i + self.token_budget])
+            for i in range(0, len(tokens), self.token_budget)
+        ]
+
+    def _fit(self, sentence: str) -> List[str]:
+        # pypdf text often has no sentence punctuation, leaving one huge "sentence";
+        # split it on line breaks, then cut what is still too long, so every piece fits
+        if self.count_tokens(sentence) <= self.token_budget:
+            return [sentence]
+
+        pieces = []
+        for line in (l.strip() for l in sentence.split("\n")):
+            if not line:
+                continue
+            if self.count_tokens(line) <= self.token_budget:
+                pieces.append(line)
+            else:
+                pieces.extend(w.strip() for w in self._windows(line) if w.strip())
+        return pieces
+
+    def _dedupe(self, documents: List[Document]) -> List[_Sentence]:
+        sentences: List[_Sentence] = []
+        earlier_docs: List[str] = []
+
+        for doc_index, doc in enumerate(documents):
+            seen_here = set()
+
+            pieces = (p for s in split_sentences(doc.page_content) for p in self._fit(s))
+            for position, sentence in enumerate(pieces):
+                normalised = _NORMALISE_RE.sub(" ", sentence.lower()).strip()
+                if not normalised or normalised in seen_here:
+                    continue
+                # Overlap can start mid-sentence, so a fragment of an earlier chunk is a duplicate too
+                if any(normalised in earlier for earlier in earlier_docs):
+                    continue
+                seen_here.add(normalised)
+                sentences.append(_Sentence(doc_index, position, sentence, self.count_tokens(sentence)))
+
+            earlier_docs.append(" " + _NORMALISE_RE.sub(" ", doc.page_content.lower()) + " ")
+
+        return sentences
+
+    def _score(self, query: str, sentences: List[_Sentence]):
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return
+
+        sentence_terms = [set(tokenize(s.text)) for s in sentences]
+        df = Counter(t for terms in sentence_terms for t in terms if t in query_terms)
+        n = len(sentences)
+
+        for sentence, terms in zip(sentences, sentence_terms):
+            matched = terms & query_terms
+            sentence.score = sum(math.log1p(n / df[t]) for t in matched)
+
+    def pack(self, query: str, documents: List[Document]) -> List[Tuple[int, str]]:
+        sentences = self._dedupe(documents)
+        self._score(query, sentences)
+
+        # Best sentences first; ties go to the higher-ranked chunk and earlier text
+        ranked = sorted(sentences, key=lambda s: (-s.score, s.doc_index, s.position))
+
+        # The top-ranked chunk always contributes its best sentence
+        top = next((s for s in ranked if s.doc_index == 0), None)
+        if top is not None:
+            ranked.remove(top)
+            ranked.insert(0, top)
+
+        selected: List[_Sentence] = []
+        used = 0
+        for sentence in ranked:
+            if used + sentence.tokens > self.token_budget:
+                continue
+            selected.append(sentence)
+            used += sentence.tokens
+
+        passages: List[Tuple[int, str]] = []
+        for doc_index in sorted({s.doc_index for s in selected}):
+            kept = sorted((s for s in selected if s.doc_index == doc_index), key=lambda s: s.position)
+            passages.append((doc_index, " ".join(s.text for s in kept)))
+
+        return passages
@@ -0,0 +1,22 @@
+from typing import List
+
+import numpy as np
+
+# Helpers that keep vectors as float32 NumPy arrays end to end when the
+# embedding model supports it, and fall back to the LangChain list API.
+
+
+def embedding_id(embedding_model) -> str:
+    return getattr(embedding_model, "embedding_id", None) or getattr(embedding_model, "model_name", "")
+
+
+def embed_texts(embedding_model, texts: List[str]) -> np.ndarray:
+    if hasattr(embedding_model, "embed_documents_array"):
+        return embedding_model.embed_documents_array(texts)
+    return np.asarray(embedding_model.embed_documents(texts), dtype=np.float32)
+
+
+def embed_text(embedding_model, text: str) -> np.ndarray:
+    if hasattr(embedding_model, "embed_query_array"):
+        return embedding_model.embed_query_array(text)
+    return np.asarray(embedding_model.embed_query(text), dtype=np.float32)
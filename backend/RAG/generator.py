@@ -2,17 +2,21 @@ from typing import List
 from langchain_core.documents import Document
 from langchain.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
+from RAG.context_packer import ContextPacker
 
 class ResponseGenerator:
-    def __init__(self, llm):
+    def __init__(self, llm, packer: ContextPacker | None = None):
         self.llm = llm
         self.parser = StrOutputParser()
         self.system_prompt = self._default_system_prompt()
+        self.packer = packer or ContextPacker()
     
-    def _format_context(self, documents: List[Document]) -> str:
+    def _format_context(self, query: str, documents: List[Document]) -> str:
+        # Only the query-relevant, de-duplicated sentences that fit the token budget
+        passages = self.packer.pack(query, documents)
         return "\n\n".join(
-            f"[Document {i+1}]\n{doc.page_content}" 
-            for i, doc in enumerate(documents)
+            f"[Document {doc_index+1}]\n{text}" 
+            for doc_index, text in passages
         )
     
     def _default_system_prompt(self) -> str:
@@ -39,11 +43,8 @@ Examples of when to return NO_ANSWER_FOUND:
 
 Always base your response on the PDF content. Be helpful and comprehensive when the information is available."""
 
-    def generate(self, query: str, retrieved_docs: List[Document]) -> str:
-        if not retrieved_docs:
-            return "NO_ANSWER_FOUND"
-        
-        context = self._format_context(retrieved_docs)
+    def _build_messages(self, query: str, retrieved_docs: List[Document]):
+        context = self._format_context(query, retrieved_docs)
         
         user_prompt = f"""PDF CONTENT:
 {context}
@@ -54,12 +55,25 @@ Analyze whether this question can be answered using the PDF content. If yes, pro
 
 RESPONSE:"""
         
-        messages = [
+        return [
             SystemMessage(content=self.system_prompt),
             HumanMessage(content=user_prompt),
         ]
+
+    def generate(self, query: str, retrieved_docs: List[Document]) -> str:
+        if not retrieved_docs:
+            return "NO_ANSWER_FOUND"
+        
+        response = self.llm.invoke(self._build_messages(query, retrieved_docs))
+        answer = self.parser.invoke(response).strip()
+        
+        return answer
+
+    async def agenerate(self, query: str, retrieved_docs: List[Document]) -> str:
+        if not retrieved_docs:
+            return "NO_ANSWER_FOUND"
         
-        response = self.llm.invoke(messages)
+        response = await self.llm.ainvoke(self._build_messages(query, retrieved_docs))
         answer = self.parser.invoke(response).strip()
         
-        return answer
\ No newline at end of file
+        return answer
@@ -0,0 +1,135 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from RAG.bm25 import BM25Index
+from RAG.embeddings import embed_text
+
+# Per-deployment fusion settings
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "0.6"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0.4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Lexical side wins outright when its best hit beats the runner-up by this factor (0 disables the skip)
+LEXICAL_DOMINANCE_RATIO = float(os.getenv("LEXICAL_DOMINANCE_RATIO", "3.0"))
+# Vector side wins outright when its best hit has at least this cosine similarity (0 disables the skip)
+VECTOR_DOMINANCE_SIMILARITY = float(os.getenv("VECTOR_DOMINANCE_SIMILARITY", "0.9"))
+
+
+@dataclass
+class HybridResult:
+    indices: np.ndarray
+    scores: np.ndarray
+    used_vector: bool
+    used_lexical: bool
+
+
+def top_n_indices(scores: np.ndarray, n: int) -> np.ndarray:
+    # Partial sort: O(len) selection, then order only the n winners
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, n - 1)[:n]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class HybridSearcher:
+    """
+    Weighted reciprocal-rank fusion of Chroma vector search and BM25.
+
+    Each side contributes weight / (rrf_k + rank) into one score array over
+    all chunks, and the top_n are taken with a partial sort. BM25 runs
+    first because it is nearly free; when it is clearly dominant the
+    query embedding and the Chroma query are skipped altogether.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        embedding_model,
+        bm25_index: BM25Index,
+        chunks: List[Document],
+        ids: List[str],
+        vector_weight: float = HYBRID_VECTOR_WEIGHT,
+        lexical_weight: float = HYBRID_LEXICAL_WEIGHT,
+        rrf_k: int = RRF_K,
+        lexical_dominance_ratio: Optional[float] = LEXICAL_DOMINANCE_RATIO,
+        vector_dominance_similarity: Optional[float] = VECTOR_DOMINANCE_SIMILARITY,
+        embed_query: Optional[Callable[[str], np.ndarray]] = None,
+    ):
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.bm25_index = bm25_index
+        self.chunks = chunks
+        self.id_to_index: Dict[str, int] = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.vector_weight = vector_weight
+        self.lexical_weight = lexical_weight
+        self.rrf_k = rrf_k
+        self.lexical_dominance_ratio = lexical_dominance_ratio
+        self.vector_dominance_similarity = vector_dominance_similarity
+        # Lets callers put a cache in front of the query embedding
+        self.embed_query = embed_query or (lambda query: embed_text(embedding_model, query))
+
+    def _lexical(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.bm25_index.top_k(query, k)
+
+    def _vector(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query_embedding = self.embed_query(query)
+        result = self.vector_store._collection.query(
+            query_embeddings=[query_embedding],
+            n_results=min(k, len(self.chunks)),
+            include=["distances"],
+        )
+        indices, similarities = [], []
+        for chunk_id, distance in zip(result["ids"][0], result["distances"][0]):
+            if chunk_id in self.id_to_index:
+                indices.append(self.id_to_index[chunk_id])
+                # bge embeddings are unit-length: squared L2 = 2 - 2 * cosine
+                similarities.append(1 - distance / 2)
+        return np.asarray(indices, dtype=np.int64), np.asarray(similarities, dtype=np.float32)
+
+    def _lexical_dominant(self, lexical_scores: np.ndarray, top_n: int) -> bool:
+        # Needs enough lexical hits to fill the answer on its own
+        if not self.lexical_dominance_ratio or len(lexical_scores) < max(top_n, 2):
+            return False
+        return lexical_scores[0] >= self.lexical_dominance_ratio * lexical_scores[1]
+
+    def _vector_dominant(self, similarities: np.ndarray) -> bool:
+        if not self.vector_dominance_similarity or len(similarities) == 0:
+            return False
+        return similarities[0] >= self.vector_dominance_similarity
+
+    def _fuse(self, ranked: List[Tuple[np.ndarray, float]], top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+        fused = np.zeros(len(self.chunks), dtype=np.float32)
+        for indices, weight in ranked:
+            if len(indices):
+                fused[indices] += weight / (self.rrf_k + np.arange(1, len(indices) + 1, dtype=np.float32))
+
+        top = top_n_indices(fused, top_n)
+        top = top[fused[top] > 0]
+        return top, fused[top]
+
+    def search_result(self, query: str, k: int, top_n: int) -> HybridResult:
+        lexical_idx, lexical_scores = self._lexical(query, k)
+
+        if self._lexical_dominant(lexical_scores, top_n):
+            top, scores = self._fuse([(lexical_idx, self.lexical_weight)], top_n)
+            return HybridResult(top, scores, used_vector=False, used_lexical=True)
+
+        vector_idx, similarities = self._vector(query, k)
+
+        if len(lexical_idx) == 0 or self._vector_dominant(similarities):
+            top, scores = self._fuse([(vector_idx, self.vector_weight)], top_n)
+            return HybridResult(top, scores, used_vector=True, used_lexical=False)
+
+        top, scores = self._fuse(
+            [(vector_idx, self.vector_weight), (lexical_idx, self.lexical_weight)],
+            top_n,
+        )
+        return HybridResult(top, scores, used_vector=True, used_lexical=True)
+
+    def search(self, query: str, k: int, top_n: int) -> List[Document]:
+        result = self.search_result(query, k, top_n)
+        return [self.chunks[i] for i in result.indices]
@@ -0,0 +1,215 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Bump when the on-disk layout or the derived content (text, chunk ids) changes
+CACHE_VERSION = 4
+
+# (path, size, mtime_ns) -> sha256, so unchanged files are hashed only once per process
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def publish_dir(tmp_dir: Path, path: Path):
+    """
+    Puts a fully written tmp_dir at path with a rename. Writers of the same
+    path produce the same content (two sessions ingesting one PDF), so a
+    writer that loses the race keeps the winner's copy and drops its own.
+    """
+    path = Path(path)
+    if path.exists():
+        # Rename the old copy aside first; deleting it in place races with other writers
+        stale = Path(tempfile.mkdtemp(dir=path.parent, prefix=".stale-"))
+        try:
+            os.replace(path, stale / path.name)
+        except FileNotFoundError:
+            pass
+        finally:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    try:
+        os.replace(tmp_dir, path)
+    except OSError as e:
+        if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+            raise
+
+
+@dataclass
+class CachedIngestion:
+    doc_hash: str
+    chunks: List[Document]
+    ids: List[str]
+    embeddings: np.ndarray
+
+
+class IngestionCache:
+    """
+    Persistent store of what is derived from a PDF: chunks and chunk
+    embeddings (the BM25 index lives next to the vector collection). Entries are keyed by the PDF content
+    hash plus the chunker / embedding settings, so an unchanged document
+    never goes through PyPDF, OCR or the embedding model again.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def key(
+        self,
+        doc_hash: str,
+        max_tokens: int,
+        chunk_overlap: int,
+        embedding_model_name: str = "",
+    ) -> str:
+        settings = f"v{CACHE_VERSION}|{doc_hash}|{max_tokens}|{chunk_overlap}|{embedding_model_name}"
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def load(self, key: str) -> Optional[CachedIngestion]:
+        entry_dir = self._entry_dir(key)
+        manifest_path = entry_dir / "manifest.json"
+
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            chunks = [
+                Document(page_content=c["page_content"], metadata=c["metadata"])
+                for c in manifest["chunks"]
+            ]
+            embeddings = np.load(entry_dir / "embeddings.npy")
+
+        except (OSError, ValueError, KeyError):
+            # Corrupt / partial entry - treat as a miss, it will be rewritten
+            return None
+
+        return CachedIngestion(
+            doc_hash=manifest["doc_hash"],
+            chunks=chunks,
+            ids=manifest["ids"],
+            embeddings=embeddings,
+        )
+
+    def save(
+        self,
+        key: str,
+        doc_hash: str,
+        chunks: List[Document],
+        ids: List[str],
+        embeddings: np.ndarray,
+    ) -> CachedIngestion:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write into a temp dir and rename, so readers never see half an entry
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-"))
+
+        try:
+            manifest = {
+                "version": CACHE_VERSION,
+                "doc_hash": doc_hash,
+                "ids": ids,
+                "chunks": [
+                    {"page_content": c.page_content, "metadata": c.metadata}
+                    for c in chunks
+                ],
+            }
+            with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            np.save(tmp_dir / "embeddings.npy", np.asarray(embeddings, dtype=np.float32))
+
+            publish_dir(tmp_dir, self._entry_dir(key))
+
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return CachedIngestion(
+            doc_hash=doc_hash,
+            chunks=chunks,
+            ids=ids,
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+        )
+
+
+class EmbeddingStore:
+    """
+    Chunk embeddings keyed by (embedding model, chunk content hash).
+
+    Independent of the document, so re-ingesting a slightly edited PDF only
+    sends the chunks whose text actually changed through the model.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._db_path = self.cache_dir / "embeddings.sqlite3"
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, content_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, content_hash))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+
+        with self._connect() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+
+        return found
+
+    def put_many(self, model: str, hashes: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, vector) VALUES (?, ?, ?)",
+                [(model, h, v.tobytes()) for h, v in zip(hashes, vectors)],
+            )
@@ -1,53 +1,135 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List
+from typing import Deque, Iterator, List, Optional, Tuple, Union
 import pytesseract
 from pypdf import PdfReader
 from pdf2image import convert_from_path
 from langchain_core.documents import Document
 
+logger = logging.getLogger(__name__)
+
+# Pages with less extracted text than this are treated as scanned and OCR'd
+OCR_MIN_CHARS = 20
+# Below this page count OCR runs in-process; pool start-up would cost more than it saves
+PARALLEL_MIN_PAGES = 32
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+# Shared by every ingest in this process, created on the first page that needs OCR
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # spawn: the API process holds model / batching threads that must not be forked
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _ocr_pool
+
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        pool, _ocr_pool = _ocr_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _ocr_page(pdf_path: str, page_index: int, text: str) -> Tuple[str, str]:
+    # Runs inside pool workers - must stay a module-level function.
+    # Rasterise just this page, so memory stays flat however long the PDF is.
+    # A blank / photo page in a text PDF must not fail the ingest when poppler
+    # or tesseract is missing or errors.
+    try:
+        images = convert_from_path(
+            pdf_path,
+            first_page=page_index + 1,
+            last_page=page_index + 1,
+        )
+        ocr_text = pytesseract.image_to_string(images[0]).strip() if images else ""
+    except Exception as e:
+        logger.warning("OCR failed for %s page %d: %r", pdf_path, page_index + 1, e)
+        return text, "pypdf"
+
+    if len(ocr_text) > len(text):
+        return ocr_text, "ocr"
+    return text, "pypdf"
+
 
 class PDFProcessor:
-    def __init__(self, pdf_path: Path):
+    def __init__(self, pdf_path: Path, workers: int = PDF_WORKERS):
         self.pdf_path = pdf_path
+        self.workers = workers
 
         if not self.pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {self.pdf_path}")
 
-    def load(self) -> List[Document]:
-        reader = PdfReader(self.pdf_path)
-        documents: List[Document] = []
+    def iter_pages(self, parallel: Optional[bool] = None) -> Iterator[Document]:
+        # Yields one Document per non-empty page, in page order, as soon as
+        # it is extracted. OCR is decided per page, not for the whole file.
+        pdf_path = str(self.pdf_path)
+        reader = PdfReader(pdf_path)
+        num_pages = len(reader.pages)
 
-        # PyPDF text only
-        for page_num, page in enumerate(reader.pages):
+        if parallel is None:
+            parallel = self.workers > 1 and num_pages >= PARALLEL_MIN_PAGES
+
+        # Text extraction stays in-process; only pages that need OCR go to the
+        # shared pool, so text PDFs never start a worker
+        pending: Deque[Tuple[int, str, Union[Tuple[str, str], Future]]] = deque()
+
+        for page_index, page in enumerate(reader.pages):
             text = (page.extract_text() or "").strip()
-            if text:
-                documents.append(
-                    Document(
-                        page_content=text,
-                        metadata={
-                            "source": str(self.pdf_path),
-                            "page": page_num + 1,
-                            "extraction_method": "pypdf",
-                        },
-                    )
-                )
-
-        # OCR fallback only if nothing extracted
-        if not documents:
-            images = convert_from_path(self.pdf_path)
-            for page_num, image in enumerate(images):
-                ocr_text = pytesseract.image_to_string(image).strip()
-                if ocr_text:
-                    documents.append(
-                        Document(
-                            page_content=ocr_text,
-                            metadata={
-                                "source": str(self.pdf_path),
-                                "page": page_num + 1,
-                                "extraction_method": "ocr",
-                            },
-                        )
-                    )
+
+            if len(text) >= OCR_MIN_CHARS:
+                result = (text, "pypdf")
+            elif parallel:
+                result = get_ocr_pool().submit(_ocr_page, pdf_path, page_index, text)
+            else:
+                result = _ocr_page(pdf_path, page_index, text)
+            pending.append((page_index, text, result))
+
+            # Hand out every page at the head of the queue that is already done
+            while pending and not (isinstance(pending[0][2], Future) and not pending[0][2].done()):
+                yield from self._to_documents(*pending.popleft())
+
+        while pending:
+            yield from self._to_documents(*pending.popleft())
+
+    def _to_documents(self, page_index: int, text: str, result) -> Iterator[Document]:
+        if isinstance(result, Future):
+            try:
+                result = result.result()
+            except Exception as e:
+                # A crashed worker breaks the pool; the next OCR page starts a fresh one
+                logger.warning("OCR failed for %s page %d: %r", self.pdf_path, page_index + 1, e)
+                if isinstance(e, BrokenProcessPool):
+                    shutdown_ocr_pool()
+                result = (text, "pypdf")
+
+        text, method = result
+        if text:
+            yield Document(
+                page_content=text,
+                metadata={
+                    "source": str(self.pdf_path),
+                    "page": page_index + 1,
+                    "extraction_method": method,
+                },
+            )
+
+    def load(self, parallel: Optional[bool] = None) -> List[Document]:
+        documents = list(self.iter_pages(parallel=parallel))
 
         if not documents:
             raise ValueError(f"No content extracted from PDF: {self.pdf_path}")
@@ -0,0 +1,44 @@
+import os
+import re
+from typing import Dict
+
+from ttl_cache import TTLCache
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", str(60 * 60)))
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalise_query(query: str) -> str:
+    # "What's in  Ooty?" and "whats in ooty" hit the same entry
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub("", query.lower())).strip()
+
+
+class QueryCache:
+    """
+    Per-document caches of query embeddings and retrieval results.
+
+    The scope is the document's collection name; Retriever invalidates it
+    whenever that collection or its BM25 index is (re)written, so stale
+    results are never served after a re-ingest.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.embeddings = TTLCache(maxsize, ttl)
+        self.results = TTLCache(maxsize, ttl)
+
+    def invalidate(self, scope: str):
+        self.embeddings.invalidate(scope)
+        self.results.invalidate(scope)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
+
+
+# Shared by every Retriever in this worker
+query_cache = QueryCache()
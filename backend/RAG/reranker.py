@@ -0,0 +1,74 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# "none", "cosine" (re-score on cached chunk embeddings) or "cross-encoder". Opt-in:
+# cosine reuses the vector side's embeddings, so it reorders the fused list by vector
+# similarity alone and embeds every query, even when lexical search dominated
+RERANKER = os.getenv("RERANKER", "none")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+class CosineReranker:
+    # Cosine between the query and the chunk vectors already held in memory - one matmul
+    def __init__(self, chunk_embeddings: np.ndarray, embed_query: Callable[[str], np.ndarray]):
+        norms = np.linalg.norm(chunk_embeddings, axis=1, keepdims=True)
+        self.chunk_embeddings = chunk_embeddings / np.maximum(norms, 1e-12)
+        self.embed_query = embed_query
+
+    def scores(self, query: str, indices: np.ndarray, chunks: List[Document]) -> np.ndarray:
+        query_embedding = np.asarray(self.embed_query(query), dtype=np.float32)
+        query_embedding = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+        return self.chunk_embeddings[indices] @ query_embedding
+
+
+class CrossEncoderReranker:
+    # Small cross-encoder scoring all (query, chunk) pairs in one batched forward pass
+    _models: Dict[str, object] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str = CROSS_ENCODER_MODEL, max_chars: int = 2000):
+        self.model_name = model_name
+        # Cross-encoders truncate at ~512 tokens anyway; don't tokenise 14k-char chunks
+        self.max_chars = max_chars
+
+    @property
+    def model(self):
+        with self._lock:
+            if self.model_name not in self._models:
+                from sentence_transformers import CrossEncoder
+
+                self._models[self.model_name] = CrossEncoder(self.model_name)
+            return self._models[self.model_name]
+
+    def scores(self, query: str, indices: np.ndarray, chunks: List[Document]) -> np.ndarray:
+        pairs = [(query, chunks[i].page_content[: self.max_chars]) for i in indices]
+        return np.asarray(
+            self.model.predict(pairs, batch_size=len(pairs), convert_to_numpy=True),
+            dtype=np.float32,
+        )
+
+
+def build_reranker(
+    name: str,
+    chunk_embeddings: Optional[np.ndarray],
+    embed_query: Callable[[str], np.ndarray],
+):
+    if name == "cosine" and chunk_embeddings is not None and len(chunk_embeddings):
+        return CosineReranker(chunk_embeddings, embed_query)
+    if name == "cross-encoder":
+        return CrossEncoderReranker()
+    return None
+
+
+def rerank(reranker, query: str, indices: np.ndarray, chunks: List[Document], top_n: int) -> np.ndarray:
+    if reranker is None or len(indices) <= 1:
+        return indices[:top_n]
+
+    scores = reranker.scores(query, indices, chunks)
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    return indices[order]
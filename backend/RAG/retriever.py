@@ -1,13 +1,23 @@
+import logging
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 from langchain_core.documents import Document
-from langchain_community.retrievers import BM25Retriever
-from langchain_classic.retrievers import EnsembleRetriever
 
 from RAG.loadPDF import PDFProcessor
 from RAG.chunking import DocumentChunker
-from RAG.vectorDB import VectorStoreManager
+from RAG.vectorDB import CollectionRegistry, VectorStoreManager, collection_name_for, bm25_path_for
+from RAG.bm25 import BM25Index
+from RAG.hybrid import HybridSearcher
+from RAG.query_cache import normalise_query, query_cache
+from RAG.embeddings import embed_text, embed_texts, embedding_id
+from RAG.ingestion_cache import CachedIngestion, EmbeddingStore, IngestionCache, file_hash
+from RAG.reranker import RERANK_TOP_N, RERANKER, build_reranker, rerank
+from langfuse.decorators import observe
+
+logger = logging.getLogger(__name__)
 
 class Retriever:
     def __init__(
@@ -15,79 +25,217 @@ class Retriever:
         pdf_path: str,
         embedding_model,
         persist_dir: str = "chroma_db",
+        cache_dir: str = "ingestion_cache",
         max_tokens: int = 3500,
         chunk_overlap: int = 200,
         k: int = 10,  
         top_n: int = 5,  
+        embed_batch_size: int = 64,
+        reranker: Optional[str] = RERANKER,
+        rerank_top_n: int = RERANK_TOP_N,
     ):
         self.pdf_path = Path(pdf_path)
         self.persist_dir = Path(persist_dir)
+        self.cache_dir = Path(cache_dir)
         self.max_tokens = max_tokens
         self.chunk_overlap = chunk_overlap
         self.k = k
         self.top_n = top_n
+        self.embed_batch_size = embed_batch_size
+        self.reranker_name = reranker or "none"
+        self.rerank_top_n = rerank_top_n
+        self.reranker = None
+        self.last_timings: Dict[str, float] = {}
         self.embedding_model = embedding_model
         self.vector_store = None
         self.retriever = None
         self.chunks = []
+        self.bm25_index = None
+        self.collection_name = None
+        self._registry = None
 
     def initialize(self, rebuild: bool = False):
-        
-        # Load PDF
-        pdf_processor = PDFProcessor(self.pdf_path)
-        docs = pdf_processor.load()
 
-        # Chunk
-        chunker = DocumentChunker(
-            max_tokens=self.max_tokens,
-            chunk_overlap=self.chunk_overlap,
-        )
-        self.chunks = chunker.chunk(docs)
+        # Chunks and embeddings come from the ingestion cache when
+        # this exact PDF was already processed with the same settings
+        ingestion, ingestion_key = self._load_or_ingest()
+        self.chunks = ingestion.chunks
+
+        # Vector store - one collection per document, shared by every
+        # session that uploads the same PDF
+        self.collection_name = collection_name_for(ingestion.doc_hash, ingestion_key)
+        self._registry = CollectionRegistry.for_dir(self.persist_dir)
+        self._registry.acquire(self.collection_name)
 
-        # Vector store
         vector_manager = VectorStoreManager(
             persist_dir=self.persist_dir,
             embedding_model=self.embedding_model,
+            collection_name=self.collection_name,
         )
 
+        self.vector_store = vector_manager.initialize_vector_store()
+
         if rebuild:
             vector_manager.clear_vector_store()
+            query_cache.invalidate(self.collection_name)
 
-        self.vector_store = vector_manager.initialize_vector_store()
+        # Upserts are keyed by chunk id, so refilling a partial or evicted
+        # collection never duplicates data
+        if vector_manager.get_document_count() != len(ingestion.ids):
+            vector_manager.store_documents(
+                ingestion.chunks,
+                embeddings=ingestion.embeddings,
+                ids=ingestion.ids,
+            )
+            query_cache.invalidate(self.collection_name)
 
-        if vector_manager.get_document_count() == 0:
-            vector_manager.store_documents(self.chunks)
+        # BM25 postings are stored next to the collection and memory-mapped
+        bm25_path = bm25_path_for(self.persist_dir, self.collection_name)
+        self.bm25_index = BM25Index.load(bm25_path)
+        if self.bm25_index is None or self.bm25_index.num_docs != len(self.chunks):
+            self.bm25_index = BM25Index.build([c.page_content for c in self.chunks])
+            self.bm25_index.save(bm25_path)
+            query_cache.invalidate(self.collection_name)
 
-    
-        self._setup_retriever()
+        self._setup_retriever(ingestion)
+
+    def close(self):
+        # Release the collection lease so the collection becomes evictable again
+        if self._registry is not None and self.collection_name:
+            self._registry.release(self.collection_name)
+            self._registry = None
+
+    def _load_or_ingest(self) -> Tuple[CachedIngestion, str]:
+        doc_hash = file_hash(self.pdf_path)
+
+        cache = IngestionCache(self.cache_dir)
+        key = cache.key(
+            doc_hash,
+            self.max_tokens,
+            self.chunk_overlap,
+            embedding_id(self.embedding_model),
+        )
+
+        cached = cache.load(key)
+        if cached is not None:
+            return cached, key
+
+        # Pages stream out of the loader into the chunker, and new chunks
+        # are embedded in batches while later pages are still being extracted
+        pdf_processor = PDFProcessor(self.pdf_path)
+        chunker = DocumentChunker(
+            max_tokens=self.max_tokens,
+            chunk_overlap=self.chunk_overlap,
+        )
+
+        model_name = embedding_id(self.embedding_model)
+        embedding_store = EmbeddingStore(self.cache_dir)
+
+        chunks: List[Document] = []
+        vectors = {}
+        pending: List[Document] = []
+
+        for chunk in chunker.iter_chunks(pdf_processor.iter_pages(), doc_hash):
+            chunks.append(chunk)
+            pending.append(chunk)
+            if len(pending) >= self.embed_batch_size:
+                vectors.update(self._embed_new(pending, embedding_store, model_name))
+                pending = []
+
+        if pending:
+            vectors.update(self._embed_new(pending, embedding_store, model_name))
+
+        if not chunks:
+            raise ValueError(f"No content extracted from PDF: {self.pdf_path}")
+
+        ids = [c.metadata["chunk_id"] for c in chunks]
+        embeddings = np.stack([vectors[c.metadata["content_hash"]] for c in chunks])
+
+        return cache.save(key, doc_hash, chunks, ids, embeddings), key
+
+    def _embed_new(self, chunks: List[Document], embedding_store: EmbeddingStore, model_name: str):
+        # Only chunks whose text has never been embedded go through the model
+        hashes = [c.metadata["content_hash"] for c in chunks]
+        known = embedding_store.get_many(model_name, hashes)
+
+        missing = {}
+        for chunk in chunks:
+            h = chunk.metadata["content_hash"]
+            if h not in known and h not in missing:
+                missing[h] = chunk.page_content
+
+        if missing:
+            new_vectors = embed_texts(self.embedding_model, list(missing.values()))
+            embedding_store.put_many(model_name, list(missing), new_vectors)
+            known.update(zip(missing, new_vectors))
+
+        return known
 
     # hybrid retriever
-    def _setup_retriever(self):
-        
-        # BM25 retriever for lexical search
-        bm25 = BM25Retriever.from_documents(self.chunks, k=self.k)
-        
-        # Vector retriever with similarity search
-        vector = self.vector_store.as_retriever(
-            search_type="similarity", 
-            search_kwargs={
-                "k": self.k,
-            },
+    def _setup_retriever(self, ingestion: CachedIngestion):
+
+        # Weighted RRF over vector (Chroma) and lexical (BM25) rankings
+        self.retriever = HybridSearcher(
+            vector_store=self.vector_store,
+            embedding_model=self.embedding_model,
+            bm25_index=self.bm25_index,
+            chunks=self.chunks,
+            ids=ingestion.ids,
+            embed_query=self._embed_query_cached,
         )
 
-        # Ensemble retriever (hybrid)
-        self.retriever = EnsembleRetriever(
-            retrievers=[vector, bm25],
-            weights=[0.6, 0.4], 
+        # Optional re-rank of the k fused candidates down to rerank_top_n
+        self.reranker = build_reranker(
+            self.reranker_name,
+            ingestion.embeddings,
+            self._embed_query_cached,
         )
 
+    def _embed_query_cached(self, query: str) -> np.ndarray:
+        key = normalise_query(query)
+        embedding = query_cache.embeddings.get(self.collection_name, key)
+        if embedding is None:
+            embedding = embed_text(self.embedding_model, query)
+            query_cache.embeddings.set(self.collection_name, key, embedding)
+        return embedding
+
     def retrieve(self, query: str) -> List[Document]:
         if self.retriever is None:
             raise RuntimeError("Retriever not initialized")
-        
-        results = self.retriever.invoke(query)
 
-        return results[:self.top_n]
+        # Repeat questions skip the embedding pass and the Chroma query
+        key = (normalise_query(query), self.k, self.top_n, self.reranker_name, self.rerank_top_n)
+        docs = query_cache.results.get(self.collection_name, key)
+        if docs is not None:
+            self.last_timings = {"retrieve_ms": 0.0, "rerank_ms": 0.0}
+            logger.info("Query cache: %s", query_cache.stats())
+            return list(docs)
+
+        started = time.perf_counter()
+        if self.reranker is None:
+            result = self.retriever.search_result(query, k=self.k, top_n=self.top_n)
+            indices = result.indices
+            rerank_ms = 0.0
+        else:
+            # Hand the re-ranker every fused candidate, not just the first top_n
+            result = self.retriever.search_result(query, k=self.k, top_n=self.k)
+            retrieved = time.perf_counter()
+            indices = self._rerank(query, result.indices)
+            rerank_ms = (time.perf_counter() - retrieved) * 1000
+
+        total_ms = (time.perf_counter() - started) * 1000
+        self.last_timings = {"retrieve_ms": total_ms - rerank_ms, "rerank_ms": rerank_ms}
+        logger.info("Retrieval %.1f ms, re-rank (%s) %.1f ms", total_ms - rerank_ms, self.reranker_name, rerank_ms)
+
+        docs = [self.chunks[i] for i in indices]
+        query_cache.results.set(self.collection_name, key, docs)
+        logger.info("Query cache: %s", query_cache.stats())
+        return list(docs)
+
+    @observe(name="rerank")
+    def _rerank(self, query: str, indices: np.ndarray) -> np.ndarray:
+        # Separate span, so re-rank latency is visible on its own in traces
+        return rerank(self.reranker, query, indices, self.chunks, self.rerank_top_n)
     
     def retrieve_vector_only(self, query: str) -> List[Document]:
         
@@ -1,42 +1,356 @@
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+import chromadb
+import numpy as np
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
+from RAG.chunking import content_hash
+from RAG.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+# Collections not used for this long are dropped (their embeddings stay in the ingestion cache)
+COLLECTION_TTL_SECONDS = int(os.getenv("COLLECTION_TTL_SECONDS", str(6 * 60 * 60)))
+# Upper bound on live per-document collections; least recently used are dropped first
+MAX_COLLECTIONS = int(os.getenv("MAX_COLLECTIONS", "50"))
+# Minimum gap between two eviction sweeps
+EVICTION_INTERVAL_SECONDS = 60
+# A lease not released within this long (e.g. its worker died) stops protecting the collection
+LEASE_TTL_SECONDS = int(os.getenv("COLLECTION_LEASE_TTL_SECONDS", str(30 * 60)))
+# Bulk ingest batch sizes
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "1000"))
+
+
+@dataclass
+class IngestStats:
+    chunks: int = 0
+    embed_ms: float = 0.0
+    write_ms: float = 0.0
+    total_ms: float = 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / (self.total_ms / 1000) if self.total_ms else 0.0
+
+
+def collection_name_for(doc_hash: str, ingestion_key: str = "") -> str:
+    # Chroma names: 3-63 chars, [a-zA-Z0-9._-]
+    if ingestion_key:
+        return f"doc_{doc_hash[:24]}_{ingestion_key[:12]}"
+    return f"doc_{doc_hash[:24]}"
+
+
+def bm25_path_for(persist_dir: Path, collection_name: str) -> Path:
+    # Lexical index files live beside the Chroma data for the same collection
+    return Path(persist_dir) / "bm25" / collection_name
+
+
+class CollectionRegistry:
+    """
+    Tracks the per-document Chroma collections under one persist dir.
+
+    - Leases protect collections that are in use. They are recorded per
+      worker in a small SQLite table (with an expiry, so a dead worker's
+      leases lapse) next to last_used, so every worker sharing the persist
+      dir sees them
+    - Cold, unleased collections are evicted by TTL, then by LRU above
+      MAX_COLLECTIONS
+    """
+
+    _instances: Dict[str, "CollectionRegistry"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        persist_dir: Path,
+        ttl_seconds: int = COLLECTION_TTL_SECONDS,
+        max_collections: int = MAX_COLLECTIONS,
+    ):
+        self.persist_dir = Path(persist_dir)
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_collections = max_collections
+
+        self.client = chromadb.PersistentClient(path=str(self.persist_dir))
+        self._db_path = self.persist_dir / "collections_registry.sqlite3"
+        self._refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS collections ("
+                "name TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "name TEXT NOT NULL, holder TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (name, holder))"
+            )
+
+    @classmethod
+    def for_dir(cls, persist_dir: Path) -> "CollectionRegistry":
+        # One registry (and one Chroma client) per persist dir per process
+        key = str(Path(persist_dir).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(persist_dir)
+            return cls._instances[key]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def _touch(self, conn: sqlite3.Connection, name: str, now: float):
+        conn.execute(
+            "INSERT INTO collections (name, last_used) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET last_used = excluded.last_used",
+            (name, now),
+        )
+
+    def touch(self, name: str):
+        with self._connect() as conn:
+            self._touch(conn, name, time.time())
+
+    def acquire(self, name: str):
+        with self._lock:
+            self._refcounts[name] = self._refcounts.get(name, 0) + 1
+
+        # One row per (collection, worker); this worker's reference count stays in memory.
+        # The write waits for any sweep in progress, so the collection is either
+        # protected before a sweep looks at it or already gone (and recreated by the caller).
+        now = time.time()
+        with self._connect() as conn:
+            self._touch(conn, name, now)
+            conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name, holder) DO UPDATE SET expires_at = excluded.expires_at",
+                (name, self._holder, now + LEASE_TTL_SECONDS),
+            )
+        self.evict()
+
+    def release(self, name: str):
+        with self._lock:
+            count = self._refcounts.get(name, 0) - 1
+            if count > 0:
+                self._refcounts[name] = count
+            else:
+                self._refcounts.pop(name, None)
+
+        with self._connect() as conn:
+            self._touch(conn, name, time.time())
+            if count <= 0:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, self._holder))
+
+    @contextmanager
+    def lease(self, name: str):
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def evict(self, force: bool = False) -> List[str]:
+        now = time.time()
+        if not force and now - self._last_sweep < EVICTION_INTERVAL_SECONDS:
+            return []
+        self._last_sweep = now
+
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            # The write lock is held until the victims are deleted, so no worker
+            # can lease one of them between the check and the delete
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            rows = conn.execute(
+                "SELECT name, last_used FROM collections ORDER BY last_used DESC"
+            ).fetchall()
+            leased = {name for (name,) in conn.execute("SELECT DISTINCT name FROM leases")}
+
+            with self._lock:
+                # This worker's own leases hold even once their row has expired
+                in_use = leased | set(self._refcounts)
+
+            victims = []
+            for rank, (name, last_used) in enumerate(rows):
+                if name in in_use:
+                    continue
+                expired = now - last_used > self.ttl_seconds
+                over_capacity = rank >= self.max_collections
+                if expired or over_capacity:
+                    victims.append(name)
+
+            for name in victims:
+                try:
+                    self.client.delete_collection(name)
+                except Exception:
+                    # Already gone
+                    pass
+                shutil.rmtree(bm25_path_for(self.persist_dir, name), ignore_errors=True)
+
+            conn.executemany(
+                "DELETE FROM collections WHERE name = ?",
+                [(name,) for name in victims],
+            )
+            conn.execute("COMMIT")
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+
+        if victims:
+            logger.info("Evicted %d cold vector collections", len(victims))
+
+        return victims
+
 
 class VectorStoreManager:
-    def __init__(self, persist_dir: Path, embedding_model):
+    def __init__(
+        self,
+        persist_dir: Path,
+        embedding_model,
+        collection_name: str = "rag_collection",
+    ):
         self.persist_dir = persist_dir
         self.embedding_model = embedding_model
+        self.collection_name = collection_name
         self.vector_store: Chroma | None = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_writes: List[Future] = []
 
     def initialize_vector_store(self) -> Chroma:
-        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        registry = CollectionRegistry.for_dir(self.persist_dir)
 
         self.vector_store = Chroma(
-            collection_name="rag_collection",
+            client=registry.client,
+            collection_name=self.collection_name,
             embedding_function=self.embedding_model,
-            persist_directory=str(self.persist_dir),
         )
 
         return self.vector_store
 
-    def store_documents(self, chunks: List[Document], batch_size: int = 10) -> int:
+    def store_documents(
+        self,
+        chunks: List[Document],
+        embeddings: Optional[np.ndarray] = None,
+        ids: Optional[List[str]] = None,
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        write_batch_size: int = WRITE_BATCH_SIZE,
+        write_behind: bool = False,
+    ) -> IngestStats:
+        """
+        Bulk ingest: embeddings are computed in large batches (or taken as
+        given) and written as idempotent upserts keyed by stable chunk ids,
+        so re-running an ingest never duplicates data.
+
+        With write_behind=True the upserts go to this manager's writer thread
+        while the next batch is embedded, and the returned stats fill in as
+        they complete. Call flush() (or close()) before querying.
+        """
         if self.vector_store is None:
             raise ValueError("Vector store not initialized")
 
-        valid_chunks = [c for c in chunks if c.page_content.strip()]
-        if not valid_chunks:
+        keep = [i for i, c in enumerate(chunks) if c.page_content.strip()]
+        if not keep:
             raise ValueError("All chunks are empty")
 
-        total = len(valid_chunks)
+        chunks = [chunks[i] for i in keep]
+        if ids is None:
+            # Stable ids make every write an idempotent upsert
+            ids = [c.metadata.get("chunk_id") or content_hash(c.page_content) for c in chunks]
+        else:
+            ids = [ids[i] for i in keep]
+        if embeddings is not None:
+            embeddings = np.asarray(embeddings, dtype=np.float32)[keep]
+
+        stats = IngestStats()
+        started = time.perf_counter()
+
+        for i in range(0, len(chunks), embed_batch_size):
+            batch = chunks[i : i + embed_batch_size]
+
+            if embeddings is None:
+                t0 = time.perf_counter()
+                batch_vectors = embed_texts(self.embedding_model, [c.page_content for c in batch])
+                stats.embed_ms += (time.perf_counter() - t0) * 1000
+            else:
+                batch_vectors = embeddings[i : i + embed_batch_size]
+
+            for j in range(0, len(batch), write_batch_size):
+                self._write(
+                    write_behind,
+                    self._upsert,
+                    ids[i + j : i + j + write_batch_size],
+                    batch[j : j + write_batch_size],
+                    batch_vectors[j : j + write_batch_size],
+                    stats,
+                )
+
+        # Queued behind this call's upserts, so total_ms covers the last write
+        self._write(write_behind, self._finish, stats, started)
+
+        return stats
+
+    def _write(self, write_behind: bool, fn, *args):
+        if not write_behind:
+            fn(*args)
+            return
+
+        if self._write_executor is None:
+            # One writer thread keeps upserts (and each call's _finish) in order
+            self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-writer")
+        self._pending_writes.append(self._write_executor.submit(fn, *args))
+
+    def _upsert(self, ids: List[str], chunks: List[Document], vectors: np.ndarray, stats: IngestStats):
+        t0 = time.perf_counter()
+        self.vector_store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[c.page_content for c in chunks],
+            metadatas=[c.metadata for c in chunks],
+        )
+        stats.write_ms += (time.perf_counter() - t0) * 1000
+        stats.chunks += len(ids)
+
+    def _finish(self, stats: IngestStats, started: float):
+        stats.total_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            "Ingested %d chunks into %s: %.1f chunks/s, embed %.0f ms, write %.0f ms",
+            stats.chunks,
+            self.collection_name,
+            stats.chunks_per_s,
+            stats.embed_ms,
+            stats.write_ms,
+        )
 
-        for i in range(0, total, batch_size):
-            batch = valid_chunks[i : i + batch_size]
-            self.vector_store.add_documents(batch)
-            print(f"Stored {min(i + batch_size, total)}/{total} chunks")
+    def flush(self):
+        # Waits for every write-behind upsert; re-raises the first write error
+        pending, self._pending_writes = self._pending_writes, []
+        errors = [f.exception() for f in pending]
+        first_error = next((e for e in errors if e is not None), None)
+        if first_error is not None:
+            raise first_error
 
-        return total
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._write_executor is not None:
+                self._write_executor.shutdown(wait=True)
+                self._write_executor = None
 
     def get_document_count(self) -> int:
         if self.vector_store is None:
@@ -48,12 +362,12 @@ class VectorStoreManager:
         if self.vector_store is None:
             return
 
-        data = self.vector_store.get(include=["ids"])
+        data = self.vector_store.get(include=[])
         ids = data.get("ids", [])
 
         if not ids:
-            print("Vector store already empty")
+            logger.info("Vector store %s already empty", self.collection_name)
             return
 
         self.vector_store._collection.delete(ids=ids)
-        print(f"Deleted {len(ids)} documents from vector store")
+        logger.info("Deleted %d documents from %s", len(ids), self.collection_name)
@@ -0,0 +1,54 @@
+import asyncio
+from travelstate import TravelState
+
+
+# Purpose:
+# Runs a tool-using agent (weather_analyst / general_assistant) as one
+# self-contained graph branch, so independent agents can be fanned out in
+# parallel instead of taking turns through the shared "tools" node.
+#
+# What it does:
+# - Calls the agent, executes the tool calls it makes, calls it again
+# - Keeps the tool round-trip in a local message list
+#
+# Output:
+# - Only the agent's own result fields plus its final message, so parallel
+#   branches never write the same state key
+
+MAX_TOOL_ROUNDS = 3
+
+# Written by every agent; kept local to the branch
+BRANCH_LOCAL_KEYS = {"messages", "last_active_agent"}
+
+
+async def run_tool_calls(tool_calls: list, tools_by_name: dict) -> list:
+    return await asyncio.gather(*(
+        tools_by_name[call["name"]].ainvoke({**call, "type": "tool_call"})
+        for call in tool_calls
+    ))
+
+
+async def run_agent_branch(state: TravelState, agent_node, tools: list, llm) -> dict:
+
+    tools_by_name = {t.name: t for t in tools}
+    messages = list(state.get("messages", []))
+    result = {}
+    reply = None
+
+    for _ in range(MAX_TOOL_ROUNDS):
+        update = await agent_node({**state, "messages": messages}, llm=llm)
+        result.update({k: v for k, v in update.items() if k not in BRANCH_LOCAL_KEYS})
+
+        new_messages = update.get("messages", [])
+        messages.extend(new_messages)
+        reply = new_messages[-1] if new_messages else None
+
+        if not getattr(reply, "tool_calls", None):
+            break
+
+        messages.extend(await run_tool_calls(reply.tool_calls, tools_by_name))
+
+    if reply is not None and not getattr(reply, "tool_calls", None):
+        result["messages"] = [reply]
+
+    return result
@@ -1,7 +1,7 @@
 import uuid
 from travelstate import TravelState
 from prompts import GENERAL_QUERY_PROMPT, build_general_assistant_context
-from utils import collect_tool_results, invoke_model, is_greeting_via_llm
+from utils import collect_tool_results, ainvoke_model, is_greeting_via_llm
 from langfuse.decorators import observe
 from langchain_core.messages import ToolMessage, AIMessage
 
@@ -13,7 +13,7 @@ from langchain_core.messages import ToolMessage, AIMessage
 # - Returns either a web search tool call or a final answer to the user’s question
 
 @observe(name="general_query_agent")
-def general_query_node(state: TravelState, llm) -> dict:
+async def general_query_node(state: TravelState, llm) -> dict:
 
     messages = state.get("messages", [])
     user_query = state.get("user_query", "")
@@ -23,10 +23,10 @@ def general_query_node(state: TravelState, llm) -> dict:
 
     tool_results_block = collect_tool_results(messages)
 
-    is_greeting = is_greeting_via_llm(llm, user_query)
+    is_greeting = await is_greeting_via_llm(llm, user_query)
 
     if is_greeting:
-        response = invoke_model(
+        response = await ainvoke_model(
             model=llm,
             systemMessage=GENERAL_QUERY_PROMPT,
             humanMessage=user_query
@@ -48,7 +48,7 @@ def general_query_node(state: TravelState, llm) -> dict:
             pdf_data=pdf_data if pdf_data or vector_created else ""
         )
 
-        response = invoke_model(
+        response = await ainvoke_model(
             model=llm,
             systemMessage=GENERAL_QUERY_PROMPT,
             humanMessage=context
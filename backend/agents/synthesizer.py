@@ -1,6 +1,6 @@
 from travelstate import TravelState
 from prompts import SYNTHESIZER_PROMPT
-from utils import invoke_model
+from utils import ainvoke_model
 from langfuse.decorators import observe
 from langchain_core.messages import  AIMessage
 from langgraph.types import  interrupt
@@ -18,7 +18,7 @@ from langgraph.types import  interrupt
 # - Includes extracted places and optimized route details when available
 
 @observe(name="synthesizer_agent")
-def synthesizer_node(state: TravelState, llm) -> dict:
+async def synthesizer_node(state: TravelState, llm) -> dict:
     
     user_query = state.get("user_query", "")
     num_days = state.get("trip_days", 0)
@@ -92,7 +92,7 @@ def synthesizer_node(state: TravelState, llm) -> dict:
     SYNTHESIS INSTRUCTIONS:{instructions_block}
     """.strip()
 
-    final_response = invoke_model(
+    final_response = await ainvoke_model(
         systemMessage=SYNTHESIZER_PROMPT,
         humanMessage=context
     )
@@ -1,7 +1,7 @@
 import uuid
 from travelstate import TravelState
 from prompts import TRIP_PLANNER_PROMPT , build_trip_planner_context_with_pdf_data, build_trip_planner_context_with_preferences
-from utils import collect_tool_results, invoke_model
+from utils import collect_tool_results, ainvoke_model
 from langfuse.decorators import observe
 from langchain_core.messages import ToolMessage, AIMessage
 
@@ -19,7 +19,7 @@ from langchain_core.messages import ToolMessage, AIMessage
 # - Returns either tool calls or a complete trip itinerary
 
 @observe(name="trip_planner_agent")
-def trip_planner_node(state: TravelState, llm) -> TravelState:
+async def trip_planner_node(state: TravelState, llm) -> TravelState:
 
     messages = state.get("messages", [])
     user_query = state.get("user_query", "")
@@ -71,7 +71,7 @@ def trip_planner_node(state: TravelState, llm) -> TravelState:
             tool_results_block
         )
 
-        response = invoke_model(
+        response = await ainvoke_model(
             systemMessage=TRIP_PLANNER_PROMPT,
             humanMessage=context
         )
@@ -92,7 +92,7 @@ def trip_planner_node(state: TravelState, llm) -> TravelState:
             route_context_block
         )
 
-        response = invoke_model(
+        response = await ainvoke_model(
             model=llm,
             systemMessage=TRIP_PLANNER_PROMPT,
             humanMessage=context
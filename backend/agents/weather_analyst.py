@@ -1,7 +1,7 @@
 import uuid
 from travelstate import TravelState
 from prompts import WEATHER_ANALYST_PROMPT, build_weather_analyst_context
-from utils import collect_tool_results, invoke_model
+from utils import collect_tool_results, ainvoke_model
 from langfuse.decorators import observe
 from langchain_core.messages import ToolMessage, AIMessage
 
@@ -19,7 +19,7 @@ from langchain_core.messages import ToolMessage, AIMessage
 # - Returns either a weather tool call or a clear weather explanation
 
 @observe(name="weather_analyst_agent")
-def weather_analyst_node(state: TravelState, llm) -> dict:
+async def weather_analyst_node(state: TravelState, llm) -> dict:
 
     messages = state.get("messages", [])
     user_query = state.get("user_query", "")
@@ -38,7 +38,7 @@ def weather_analyst_node(state: TravelState, llm) -> dict:
             tool_results_block
         )
 
-        response = invoke_model(
+        response = await ainvoke_model(
             model=llm,
             systemMessage=WEATHER_ANALYST_PROMPT,
             humanMessage=context
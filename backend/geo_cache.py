@@ -0,0 +1,402 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Process-wide geocode results, shared by route_description and route_optimizer
+# and persisted across restarts. An empty GEOCODE_CACHE_PATH keeps it in memory only.
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "geo_cache/geocode.sqlite3")
+GEOCODE_CACHE_TTL_SECONDS = float(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+# "Not found" is cached too, but for less time
+GEOCODE_NEGATIVE_TTL_SECONDS = float(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(24 * 60 * 60)))
+GEOCODE_MEMORY_SIZE = int(os.getenv("GEOCODE_MEMORY_SIZE", "10000"))
+
+# Reverse geocoding answers any point within this distance of a cached one
+REVERSE_GEOCODE_RADIUS_KM = float(os.getenv("REVERSE_GEOCODE_RADIUS_KM", "3"))
+REVERSE_GEOCODE_TTL_SECONDS = float(os.getenv("REVERSE_GEOCODE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+REVERSE_GEOCODE_MEMORY_CELLS = int(os.getenv("REVERSE_GEOCODE_MEMORY_CELLS", "5000"))
+
+# Returned by get() when nothing (valid) is cached; None is a cached "not found"
+MISS = object()
+
+Coordinates = Optional[Tuple[float, float]]
+
+
+def normalise_place(place: str) -> str:
+    # "Ooty", " ooty " and "OOTY" share one entry
+    return " ".join(place.lower().split())
+
+
+class GeocodeStore:
+    """
+    place -> (lat, lon) with TTL.
+
+    Reads go to an in-memory LRU first, then to SQLite; a SQLite hit is
+    promoted into memory. Several workers can share one database file.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = GEOCODE_CACHE_PATH,
+        ttl: float = GEOCODE_CACHE_TTL_SECONDS,
+        negative_ttl: float = GEOCODE_NEGATIVE_TTL_SECONDS,
+        memory_size: int = GEOCODE_MEMORY_SIZE,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, Coordinates]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db_path = Path(db_path) if db_path else None
+        if self._db_path is not None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode ("
+                    "place TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def _remember(self, key: str, expires_at: float, value: Coordinates):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, places: List[str]) -> dict:
+        # place -> (lat, lon) or None for every cached place; misses are left out.
+        # Blocking (SQLite) - call off the event loop.
+        found = {}
+        pending = []
+        now = time.time()
+
+        with self._lock:
+            for place in places:
+                key = normalise_place(place)
+                entry = self._memory.get(key)
+                if entry is not None and entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    found[place] = entry[1]
+                else:
+                    pending.append((place, key))
+
+        rows = {}
+        if pending and self._db_path is not None:
+            keys = list(dict.fromkeys(key for _, key in pending))
+            with self._connect() as conn:
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    batch = keys[i : i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for key, lat, lon, expires_at in conn.execute(
+                        f"SELECT place, lat, lon, expires_at FROM geocode "
+                        f"WHERE place IN ({placeholders}) AND expires_at > ?",
+                        [*batch, now],
+                    ):
+                        rows[key] = (lat, lon, expires_at)
+
+        with self._lock:
+            for place, key in pending:
+                row = rows.get(key)
+                if row is None:
+                    self._memory.pop(key, None)
+                    self.misses += 1
+                    continue
+
+                lat, lon, expires_at = row
+                value = None if lat is None else (lat, lon)
+                self._remember(key, expires_at, value)
+                self.hits += 1
+                self.disk_hits += 1
+                found[place] = value
+
+        return found
+
+    def get(self, place: str):
+        return self.get_many([place]).get(place, MISS)
+
+    def set_many(self, results: dict):
+        # place -> (lat, lon) or None ("not found"). Blocking - call off the event loop.
+        now = time.time()
+        records = []
+        for place, coordinates in results.items():
+            key = normalise_place(place)
+            expires_at = now + (self.ttl if coordinates else self.negative_ttl)
+            lat, lon = coordinates if coordinates else (None, None)
+            records.append((key, lat, lon, expires_at, coordinates))
+
+        with self._lock:
+            for key, _, _, expires_at, coordinates in records:
+                self._remember(key, expires_at, coordinates)
+            if self._db_path is not None and records:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO geocode (place, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+                        [r[:4] for r in records],
+                    )
+
+    def set(self, place: str, coordinates: Coordinates):
+        self.set_many({place: coordinates})
+
+    def purge_expired(self) -> int:
+        if self._db_path is None:
+            return 0
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM geocode WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Smallest side (km) of a geohash cell by precision, at the equator
+_GEOHASH_CELL_KM = {3: 156.0, 4: 19.5, 5: 4.89, 6: 0.61, 7: 0.153}
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        # Bits alternate longitude / latitude, starting with longitude
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_precision_for(radius_km: float) -> int:
+    # Finest cells that are still at least radius_km across, so the 3 x 3 block
+    # around a point covers every point within the radius
+    fitting = [p for p, size in _GEOHASH_CELL_KM.items() if size >= radius_km]
+    return max(fitting) if fitting else min(_GEOHASH_CELL_KM)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6371.0 * math.asin(math.sqrt(min(1.0, a)))
+
+
+class ReverseGeocodeStore:
+    """
+    (lat, lon) -> place name, answered from the nearest cached point within
+    radius_km. Route samples along the same corridor never repeat exactly,
+    so entries are bucketed by geohash cell and a lookup scans the point's
+    cell and its 8 neighbours. Cells are loaded from SQLite on first use.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = GEOCODE_CACHE_PATH,
+        radius_km: float = REVERSE_GEOCODE_RADIUS_KM,
+        ttl: float = REVERSE_GEOCODE_TTL_SECONDS,
+        memory_cells: int = REVERSE_GEOCODE_MEMORY_CELLS,
+    ):
+        self.radius_km = radius_km
+        self.precision = geohash_precision_for(radius_km)
+        self.ttl = ttl
+        self.memory_cells = memory_cells
+        self.hits = 0
+        self.misses = 0
+        # cell -> [(lat, lon, name, expires_at)]; a loaded cell may be empty
+        self._cells: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db_path = Path(db_path) if db_path else None
+        if self._db_path is not None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS reverse_geocode ("
+                    "geohash TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, "
+                    "name TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS reverse_geocode_cell ON reverse_geocode (geohash)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def _neighbour_cells(self, lat: float, lon: float) -> List[str]:
+        # Stepping by one cell size in each direction lands in each neighbouring cell
+        lat_step = 180.0 / 2 ** (5 * self.precision // 2)
+        lon_step = 360.0 / 2 ** ((5 * self.precision + 1) // 2)
+        cells = {
+            geohash_encode(
+                max(-90.0, min(90.0, lat + dy * lat_step)),
+                (lon + dx * lon_step + 180.0) % 360.0 - 180.0,
+                self.precision,
+            )
+            for dy in (-1, 0, 1)
+            for dx in (-1, 0, 1)
+        }
+        return sorted(cells)
+
+    def _load_cells(self, cells: List[str]):
+        # Reads every cell not yet in memory from SQLite in as few queries as possible
+        missing = [c for c in cells if c not in self._cells]
+        if not missing:
+            return
+
+        rows = []
+        if self._db_path is not None:
+            with self._connect() as conn:
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(missing), 500):
+                    batch = missing[i : i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows += conn.execute(
+                        f"SELECT geohash, lat, lon, name, expires_at FROM reverse_geocode "
+                        f"WHERE geohash IN ({placeholders}) AND expires_at > ?",
+                        [*batch, time.time()],
+                    ).fetchall()
+
+        loaded = {cell: [] for cell in missing}
+        for cell, lat, lon, name, expires_at in rows:
+            loaded[cell].append((lat, lon, name, expires_at))
+
+        with self._lock:
+            for cell, entries in loaded.items():
+                # Another caller may have loaded (and added to) it meanwhile
+                self._cells.setdefault(cell, entries)
+            while len(self._cells) > self.memory_cells:
+                self._cells.popitem(last=False)
+
+    def get_many(self, points: List[Tuple[float, float]]) -> List[Optional[str]]:
+        # Blocking (SQLite) - call off the event loop. All cells load in one query.
+        neighbours = [self._neighbour_cells(lat, lon) for lat, lon in points]
+        self._load_cells(sorted({cell for cells in neighbours for cell in cells}))
+        now = time.time()
+
+        names = []
+        with self._lock:
+            for (lat, lon), cells in zip(points, neighbours):
+                best_name, best_km = None, self.radius_km
+                for cell in cells:
+                    entries = self._cells.get(cell)
+                    if entries is None:
+                        continue
+                    self._cells.move_to_end(cell)
+                    for e_lat, e_lon, name, expires_at in entries:
+                        if expires_at <= now:
+                            continue
+                        km = distance_km(lat, lon, e_lat, e_lon)
+                        if km <= best_km:
+                            best_name, best_km = name, km
+
+                if best_name is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                names.append(best_name)
+        return names
+
+    def get(self, lat: float, lon: float) -> Optional[str]:
+        return self.get_many([(lat, lon)])[0]
+
+    def set_many(self, items: List[Tuple[float, float, str]]):
+        # (lat, lon, name) triples. Blocking - call off the event loop.
+        expires_at = time.time() + self.ttl
+        records = [(geohash_encode(lat, lon, self.precision), lat, lon, name, expires_at) for lat, lon, name in items]
+        self._load_cells(sorted({record[0] for record in records}))
+
+        with self._lock:
+            for cell, lat, lon, name, _ in records:
+                self._cells.setdefault(cell, []).append((lat, lon, name, expires_at))
+                self._cells.move_to_end(cell)
+            if self._db_path is not None and records:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT INTO reverse_geocode (geohash, lat, lon, name, expires_at) VALUES (?, ?, ?, ?, ?)",
+                        records,
+                    )
+
+    def set(self, lat: float, lon: float, name: str):
+        self.set_many([(lat, lon, name)])
+
+    def purge_expired(self) -> int:
+        if self._db_path is None:
+            return 0
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM reverse_geocode WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_cells": len(self._cells),
+            }
+
+
+_store: Optional[GeocodeStore] = None
+_reverse_store: Optional[ReverseGeocodeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_geocode_store() -> GeocodeStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = GeocodeStore()
+            purged = _store.purge_expired()
+            if purged:
+                logger.info("Geocode cache: purged %d expired entries", purged)
+        return _store
+
+
+def get_reverse_geocode_store() -> ReverseGeocodeStore:
+    global _reverse_store
+    with _store_lock:
+        if _reverse_store is None:
+            _reverse_store = ReverseGeocodeStore()
+            purged = _reverse_store.purge_expired()
+            if purged:
+                logger.info("Reverse geocode cache: purged %d expired entries", purged)
+        return _reverse_store
@@ -0,0 +1,115 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Route geometry helpers. Points are (N, 2) lat/lon arrays in degrees.
+
+EARTH_RADIUS_KM = 6371.0
+
+# Douglas-Peucker tolerance for stored route geometry (~50 m)
+ROUTE_SIMPLIFY_TOLERANCE_KM = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE_KM", "0.05"))
+# Reverse-geocode a route point every this many km, but never more than ROUTE_MAX_SAMPLES points
+ROUTE_SAMPLE_INTERVAL_KM = float(os.getenv("ROUTE_SAMPLE_INTERVAL_KM", "20"))
+ROUTE_MAX_SAMPLES = int(os.getenv("ROUTE_MAX_SAMPLES", "10"))
+
+
+def compact(points) -> np.ndarray:
+    # float32 keeps ~1 m precision at half the size of float64
+    return np.asarray(points, dtype=np.float32).reshape(-1, 2)
+
+
+def cumulative_km(points) -> np.ndarray:
+    # Distance along the line at each vertex; first entry is 0
+    pts = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    if len(pts) < 2:
+        return np.zeros(len(pts))
+
+    lat, lon = pts[:, 0], pts[:, 1]
+    a = (
+        np.sin(np.diff(lat) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    )
+    legs = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return np.concatenate([[0.0], np.cumsum(legs)])
+
+
+def simplify(points, tolerance_km: float = ROUTE_SIMPLIFY_TOLERANCE_KM) -> np.ndarray:
+    """
+    Douglas-Peucker: drop vertices closer than tolerance_km to the line
+    between the vertices kept around them. Endpoints are always kept.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    if n <= 2 or tolerance_km <= 0:
+        return compact(pts)
+
+    # Local equirectangular projection to km; plenty accurate at route scale
+    lat0 = np.radians(pts[:, 0].mean())
+    xy = np.column_stack([np.radians(pts[:, 1]) * np.cos(lat0), np.radians(pts[:, 0])]) * EARTH_RADIUS_KM
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+
+        segment = xy[end] - xy[start]
+        rel = xy[start + 1 : end] - xy[start]
+        length_sq = float(segment @ segment)
+
+        # Distance to the segment (not the infinite line), so loops back to the start survive
+        t = np.clip(rel @ segment / length_sq, 0.0, 1.0) if length_sq > 0 else np.zeros(len(rel))
+        distances = np.hypot(*(rel - np.outer(t, segment)).T)
+
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance_km:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return compact(pts[keep])
+
+
+def sample_every_km(
+    points,
+    interval_km: float = ROUTE_SAMPLE_INTERVAL_KM,
+    max_samples: Optional[int] = ROUTE_MAX_SAMPLES,
+) -> np.ndarray:
+    """
+    Points at fixed distances along the line (start and end included),
+    interpolated between vertices. The interval widens on long routes so
+    at most max_samples points come back.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 2:
+        return pts
+
+    cum = cumulative_km(pts)
+    # np.interp needs strictly increasing distances; drop repeated vertices
+    moving = np.concatenate([[True], np.diff(cum) > 0])
+    pts, cum = pts[moving], cum[moving]
+
+    total = cum[-1]
+    if total == 0:
+        return pts[:1]
+
+    interval = interval_km
+    if max_samples and max_samples > 1:
+        interval = max(interval, total / (max_samples - 1))
+
+    targets = np.arange(0.0, total, interval)
+    if total - targets[-1] > 1e-6:
+        targets = np.append(targets, total)
+    # Float rounding can leave one point too many
+    if max_samples and len(targets) > max_samples:
+        targets = np.append(targets[: max_samples - 1], total)
+
+    return np.column_stack([
+        np.interp(targets, cum, pts[:, 0]),
+        np.interp(targets, cum, pts[:, 1]),
+    ])
@@ -1,9 +1,11 @@
+from functools import partial
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 from agents.synthesizer import synthesizer_node
 from agents.trip_planner import trip_planner_node
 from agents.weather_analyst import weather_analyst_node
 from agents.general_assistant import general_query_node
+from agents.branch import run_agent_branch
 from nodes.ask_preference import ask_preference_node
 from nodes.route_description import route_description_node
 from nodes.route_optimizer import route_optimizer_node
@@ -13,7 +15,6 @@ from nodes.generator import generator_node
 from routes import (
     route_after_generator,
     route_after_query_intent,
-    route_after_tools,
     should_continue_to_tools,
 )
 from langgraph.prebuilt import ToolNode
@@ -30,18 +31,29 @@ def create_travel_workflow():
 
     workflow = StateGraph(TravelState)
 
+    # Nodes are async: partial() keeps them recognisable as coroutine functions,
+    # so the graph awaits them on the event loop under ainvoke / astream
+
     #  Nodes 
-    workflow.add_node("query_intent", lambda s: query_intent_node(s, llm))
-    workflow.add_node("retriever", lambda s: retriever_node(s, llm))
-    workflow.add_node("generator", lambda s: generator_node(s, llm))
+    workflow.add_node("query_intent", partial(query_intent_node, llm=llm))
+    workflow.add_node("retriever", partial(retriever_node, llm=llm))
+    workflow.add_node("generator", partial(generator_node, llm=llm))
     workflow.add_node("ask_preference", ask_preference_node)
-    workflow.add_node("route_description", lambda s: route_description_node(s, llm))
-    workflow.add_node("trip_planner", lambda s: trip_planner_node(s, llm))
-    workflow.add_node("route_optimizer", lambda s: route_optimizer_node(s,llm))
+    workflow.add_node("route_description", partial(route_description_node, llm=llm))
+    workflow.add_node("trip_planner", partial(trip_planner_node, llm=llm))
+    workflow.add_node("route_optimizer", partial(route_optimizer_node, llm=llm))
     workflow.add_node("tools", ToolNode(tools))
-    workflow.add_node("weather_analyst", lambda s: weather_analyst_node(s, llm))
-    workflow.add_node("general_assistant", lambda s: general_query_node(s, llm))
-    workflow.add_node("synthesizer", lambda s: synthesizer_node(s, llm))
+    # Independent agents: self-contained branches running their own tool loop
+    workflow.add_node(
+        "weather_analyst",
+        partial(run_agent_branch, agent_node=weather_analyst_node, tools=tools, llm=llm),
+    )
+    workflow.add_node(
+        "general_assistant",
+        partial(run_agent_branch, agent_node=general_query_node, tools=tools, llm=llm),
+    )
+    # defer: runs once every branch that was fanned out has finished
+    workflow.add_node("synthesizer", partial(synthesizer_node, llm=llm), defer=True)
     
     #  Edges 
     workflow.add_edge(START, "query_intent")
@@ -60,13 +72,11 @@ def create_travel_workflow():
     workflow.add_edge("route_description", "trip_planner")
     
     workflow.add_conditional_edges("trip_planner", should_continue_to_tools)
-    workflow.add_conditional_edges("weather_analyst", should_continue_to_tools)
-    workflow.add_conditional_edges("general_assistant", should_continue_to_tools)
+    workflow.add_edge("tools", "trip_planner")
+
+    workflow.add_edge("weather_analyst", "synthesizer")
+    workflow.add_edge("general_assistant", "synthesizer")
 
-    workflow.add_conditional_edges(
-        "tools",
-        route_after_tools,
-    )
     workflow.add_edge("route_optimizer", "synthesizer")
     workflow.add_edge("synthesizer", END)
     memory = MemorySaver()
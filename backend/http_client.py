@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Shared provider-client layer for Geoapify / OpenWeatherMap / Tavily.
+# - Keep-alive connection pool per provider instead of a new TCP + TLS
+#   connection for every call
+# - Per-provider timeout, concurrency limit and retry budget
+# - Jittered exponential backoff on 429 / 5xx / transport errors
+# - Token-bucket rate limit per (provider, API key)
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    timeout_s: float
+    max_concurrency: int
+    rate_per_s: float  # 0 disables rate limiting
+    burst: int
+    max_retries: int
+
+
+def _provider_from_env(name: str, timeout_s: float, max_concurrency: int, rate_per_s: float, max_retries: int) -> Provider:
+    prefix = name.upper()
+    rate = float(os.getenv(f"{prefix}_RATE_PER_S", str(rate_per_s)))
+    return Provider(
+        name=name,
+        timeout_s=float(os.getenv(f"{prefix}_TIMEOUT_S", str(timeout_s))),
+        max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(max_concurrency))),
+        rate_per_s=rate,
+        burst=int(os.getenv(f"{prefix}_BURST", str(max(1, int(rate))))),
+        max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", str(max_retries))),
+    )
+
+
+# Defaults follow the free-tier limits of each API
+PROVIDERS: Dict[str, Provider] = {
+    "geoapify": _provider_from_env("geoapify", timeout_s=10, max_concurrency=8, rate_per_s=5, max_retries=2),
+    "tavily": _provider_from_env("tavily", timeout_s=12, max_concurrency=4, rate_per_s=5, max_retries=1),
+    "openweathermap": _provider_from_env("openweathermap", timeout_s=6, max_concurrency=4, rate_per_s=1, max_retries=2),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BASE_S = float(os.getenv("HTTP_RETRY_BASE_S", "0.5"))
+RETRY_MAX_S = float(os.getenv("HTTP_RETRY_MAX_S", "8"))
+
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+
+# httpx.AsyncClient and asyncio.Semaphore are bound to the event loop they were first used on
+_clients: Dict[tuple, httpx.AsyncClient] = {}
+_semaphores: Dict[tuple, asyncio.Semaphore] = {}
+
+
+def get_async_client(provider: Optional[str] = None) -> httpx.AsyncClient:
+    key = (id(asyncio.get_running_loop()), provider)
+
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        if provider is None:
+            timeout, limits = HTTP_TIMEOUT, HTTP_LIMITS
+        else:
+            config = PROVIDERS[provider]
+            timeout = httpx.Timeout(config.timeout_s, connect=min(5.0, config.timeout_s))
+            limits = httpx.Limits(
+                max_connections=config.max_concurrency,
+                max_keepalive_connections=config.max_concurrency,
+            )
+        client = httpx.AsyncClient(timeout=timeout, limits=limits)
+        _clients[key] = client
+
+    return client
+
+
+async def close_async_clients():
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Each acquire() reserves a token up front and
+    sleeps until it is due, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate_per_s: float, capacity: int):
+        self.rate = rate_per_s
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_buckets: Dict[tuple, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def rate_limiter(provider: str, api_key: Optional[str]) -> Optional[TokenBucket]:
+    config = PROVIDERS[provider]
+    if config.rate_per_s <= 0:
+        return None
+
+    key = (provider, api_key)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(config.rate_per_s, config.burst)
+            _buckets[key] = bucket
+        return bucket
+
+
+def provider_semaphore(provider: str) -> asyncio.Semaphore:
+    key = (id(asyncio.get_running_loop()), provider)
+
+    semaphore = _semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(PROVIDERS[provider].max_concurrency)
+        _semaphores[key] = semaphore
+
+    return semaphore
+
+
+async def call_provider(provider: str, fn, *args, rate_key: Optional[str] = None, **kwargs):
+    # One attempt: rate-limit token, concurrency slot, then the call.
+    # The timeout covers the waits as well, so a backed-up provider fails fast.
+    bucket = rate_limiter(provider, rate_key)
+
+    async def limited():
+        if bucket is not None:
+            await bucket.acquire()
+        async with provider_semaphore(provider):
+            return await fn(*args, **kwargs)
+
+    return await asyncio.wait_for(limited(), timeout=PROVIDERS[provider].timeout_s)
+
+
+def backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    # Honour Retry-After when the provider sends one, otherwise full-jitter exponential backoff
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(RETRY_MAX_S, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(RETRY_MAX_S, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+
+    return random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * 2 ** attempt))
+
+
+async def provider_request(
+    provider: str,
+    method: str,
+    url: str,
+    *,
+    rate_key: Optional[str] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    HTTP request through the provider's pooled client, retried on 429 / 5xx
+    and transport errors. The last response (or error) is returned as-is.
+    """
+    client = get_async_client(provider)
+    max_retries = PROVIDERS[provider].max_retries
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = await call_provider(provider, client.request, method, url, rate_key=rate_key, **kwargs)
+        except (httpx.TransportError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.info("%s %s failed (%r), retrying in %.2fs", provider, method, e, delay)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                return response
+            delay = backoff_delay(attempt, response)
+            logger.info("%s %s returned %d, retrying in %.2fs", provider, method, response.status_code, delay)
+
+        await asyncio.sleep(delay)
@@ -1,18 +1,33 @@
+import asyncio
+import json
 import os
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Union, Dict
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from langgraph.types import Command
 from graph import create_travel_workflow
+from models import warm_up_embedding_model
+from http_client import close_async_clients
+from RAG.loadPDF import shutdown_ocr_pool
 from travelstate import TravelState
 
 load_dotenv()
 
-app = FastAPI(title="AI Travel Assistant")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model once per worker before serving traffic
+    await asyncio.to_thread(warm_up_embedding_model)
+    yield
+    await close_async_clients()
+    shutdown_ocr_pool()
+
+
+app = FastAPI(title="AI Travel Assistant", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,11 +63,49 @@ class InterruptResponse(BaseModel):
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def build_interrupt_response(interrupt_data: dict) -> InterruptResponse:
+    preference_key = interrupt_data.get("key")
+    question = interrupt_data.get("question", "")
+    interrupt_type = interrupt_data.get("type")
+    
+    input_type = interrupt_data.get("input_type")
+    
+    if not input_type:
+        if interrupt_type == "confirmation_request":
+            input_type = "confirm"
+        elif interrupt_type == "refinement_request":
+            input_type = "type"
+        elif preference_key in ["from_date", "to_date"]:
+            input_type = "date"
+        elif interrupt_data.get("options"):
+            input_type = "select"
+        else:
+            input_type = "type"
+    
+
+    return InterruptResponse(
+        key=preference_key,
+        question=question,
+        input_type=input_type,
+        options=interrupt_data.get("options"),
+        default=interrupt_data.get("default"),
+        trip_plan=interrupt_data.get("trip_plan"),
+        meta=interrupt_data.get("meta", {})
+    )
+
+
+def build_graph_input(request: ChatRequest):
+    if request.interrupt_response is not None:
+        return Command(resume=request.interrupt_response)
+
+    return TravelState(user_query=request.user_query,pdf_path=request.pdf if request.pdf else None)
+
+
 @app.post(
     "/travel",
     response_model=Union[FinalResponse, InterruptResponse]
 )
-def travel_assistant(request: ChatRequest):
+async def travel_assistant(request: ChatRequest):
 
     config = {
         "configurable": {
@@ -60,47 +113,10 @@ def travel_assistant(request: ChatRequest):
         }
     }
 
-    if request.interrupt_response is not None:
-        result = graph.invoke(
-            Command(resume=request.interrupt_response),
-            config=config
-        )
-
-    else:
-        initial_state = TravelState(user_query=request.user_query,pdf_path=request.pdf if request.pdf else None)
-        result = graph.invoke(initial_state, config=config)
+    result = await graph.ainvoke(build_graph_input(request), config=config)
 
     if "__interrupt__" in result:
-        interrupt_data = result["__interrupt__"][0].value
-        
-        preference_key = interrupt_data.get("key")
-        question = interrupt_data.get("question", "")
-        interrupt_type = interrupt_data.get("type")
-        
-        input_type = interrupt_data.get("input_type")
-        
-        if not input_type:
-            if interrupt_type == "confirmation_request":
-                input_type = "confirm"
-            elif interrupt_type == "refinement_request":
-                input_type = "type"
-            elif preference_key in ["from_date", "to_date"]:
-                input_type = "date"
-            elif interrupt_data.get("options"):
-                input_type = "select"
-            else:
-                input_type = "type"
-        
-
-        return InterruptResponse(
-            key=preference_key,
-            question=question,
-            input_type=input_type,
-            options=interrupt_data.get("options"),
-            default=interrupt_data.get("default"),
-            trip_plan=interrupt_data.get("trip_plan"),
-            meta=interrupt_data.get("meta", {})
-        )
+        return build_interrupt_response(result["__interrupt__"][0].value)
 
     return FinalResponse(
         answer=result.get(
@@ -110,6 +126,72 @@ def travel_assistant(request: ChatRequest):
     )
 
 
+# Nodes whose LLM tokens are forwarded to the client as they are generated
+STREAMED_TOKEN_NODES = {"synthesizer"}
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/travel/stream")
+async def travel_assistant_stream(request: ChatRequest):
+    """
+    Same graph run as /travel, streamed as Server-Sent Events:
+
+    - node      : {"node": name} each time a graph node finishes
+    - token     : {"node": name, "content": text} synthesizer tokens as produced
+    - interrupt : the InterruptResponse payload (stream ends, resume via /travel or /travel/stream)
+    - final     : the FinalResponse payload
+    - error     : {"detail": message}
+    """
+
+    config = {
+        "configurable": {
+            "thread_id": request.session_id
+        }
+    }
+
+    async def events():
+        final_result = None
+
+        try:
+            async for mode, chunk in graph.astream(
+                build_graph_input(request),
+                config=config,
+                stream_mode=["updates", "messages"],
+            ):
+                if mode == "messages":
+                    message, metadata = chunk
+                    node = metadata.get("langgraph_node")
+                    if node in STREAMED_TOKEN_NODES and getattr(message, "content", ""):
+                        yield sse_event("token", {"node": node, "content": message.content})
+                    continue
+
+                for node, update in chunk.items():
+                    if node == "__interrupt__":
+                        interrupt = build_interrupt_response(update[0].value)
+                        yield sse_event("interrupt", interrupt.model_dump())
+                        return
+
+                    if isinstance(update, dict) and update.get("final_result"):
+                        final_result = update["final_result"]
+                    yield sse_event("node", {"node": node})
+
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        final = FinalResponse(answer=final_result or "Sorry, I couldn't process your request.")
+        yield sse_event("final", final.model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
 
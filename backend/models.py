@@ -1,9 +1,15 @@
+import functools
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from langchain_groq import ChatGroq
 from langchain_core.embeddings import Embeddings
 from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Optional
 import itertools
+import numpy as np
 from langfuse.callback import CallbackHandler
 from dotenv import load_dotenv 
 load_dotenv()
@@ -20,6 +26,8 @@ if not API_KEYS or API_KEYS == [""]:
 # Infinite round-robin key rotation
 key_cycle = itertools.cycle(API_KEYS)
 
+# One client per key, so its HTTP connection pool is reused across calls
+@functools.lru_cache(maxsize=None)
 def get_llm_model(api_key : str):
     return ChatGroq(
         model="llama-3.3-70b-versatile",
@@ -52,26 +60,167 @@ def invoke_llm(messages):
     raise RuntimeError(f"All Groq API keys failed: {last_error}")
 
 
+async def ainvoke_llm(messages):
+    last_error = None
+
+    for _ in range(len(API_KEYS)):
+        api_key = next(key_cycle)
+        try:
+            return await get_llm_model(api_key).ainvoke(messages)
+        except Exception as e:
+            last_error = e
+            continue
+
+    raise RuntimeError(f"All Groq API keys failed: {last_error}")
+
+
+# "torch" (full precision), "int8" (dynamic quantisation of Linear layers) or "onnx" (ONNX Runtime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Micro-batching of concurrent encode calls
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+
+
+class BatchingEncoder:
+    """
+    Coalesces encode requests from concurrent callers into micro-batches.
+
+    A single background thread owns the model: it takes the first waiting
+    request, keeps collecting for up to max_wait_ms or until max_batch_size
+    texts are queued, runs one encode() and hands each caller its slice.
+    """
+
+    def __init__(self, model: SentenceTransformer, max_batch_size: int, max_wait_ms: float):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple[List[str], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_s
+
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+
+            try:
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=self.max_batch_size,
+                    convert_to_numpy=True,
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(embeddings[offset : offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch") -> SentenceTransformer:
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        except ImportError as e:
+            raise RuntimeError(
+                "ONNX embedding backend needs: pip install 'optimum[onnxruntime]'"
+            ) from e
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
 class SentenceTransformerEmbeddings(Embeddings):
     
-    def __init__(self, model_name: str = "BAAI/bge-base-en-v1.5"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-base-en-v1.5",
+        backend: str = EMBEDDING_BACKEND,
+        max_batch_size: int = EMBED_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = load_sentence_transformer(model_name, backend)
+        self.encoder = BatchingEncoder(self.model, max_batch_size, max_wait_ms)
+
+    @property
+    def embedding_id(self) -> str:
+        # Vectors from different backends are not interchangeable in the caches
+        return self.model_name if self.backend == "torch" else f"{self.model_name}:{self.backend}"
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.encoder.encode(list(texts)).astype(np.float32, copy=False)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        return self.encoder.encode([text])[0].astype(np.float32, copy=False)
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         
-        # Embed a list of documents.
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
+        # Embed a list of documents (LangChain interface; internal code uses the array methods).
+        return self.embed_documents_array(texts).tolist()
     
     def embed_query(self, text: str) -> List[float]:
         
         # Embed a single query.
-        embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        return self.embed_query_array(text).tolist()
 
 
+# One embedding model per worker process
+_embedding_model: Optional[SentenceTransformerEmbeddings] = None
+_embedding_model_lock = threading.Lock()
+
 
 def get_embedding_model():
-    return SentenceTransformerEmbeddings(
-        model_name="BAAI/bge-base-en-v1.5"
-    )
\ No newline at end of file
+    global _embedding_model
+
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = SentenceTransformerEmbeddings(
+                    model_name="BAAI/bge-base-en-v1.5"
+                )
+
+    return _embedding_model
+
+
+def warm_up_embedding_model():
+    # Load weights and run one forward pass so the first request doesn't pay for it
+    get_embedding_model().embed_query("warm up")
@@ -9,6 +9,10 @@ from langfuse.decorators import observe
 # - user_query       : The original query asked by the user
 # - retrieved_docs   : Relevant document chunks retrieved by the retriever agent
 #
+# Context:
+# - Retrieved chunks are packed into a token budget (CONTEXT_TOKEN_BUDGET): overlapping text
+#   is removed and each chunk is trimmed to the sentences that best match the query
+#
 # Model Used:
 # - LLM: ChatGroq
 # - Model: "llama-3.3-70b-versatile"
@@ -17,12 +21,12 @@ from langfuse.decorators import observe
 
 
 @observe(name="generator_node")
-def generator_node(state: TravelState, llm):
+async def generator_node(state: TravelState, llm):
     user_query = state.get("user_query", "").strip()
     retrieved_docs = state.get("retrieved_docs", [])
 
     generator = ResponseGenerator(llm)
-    answer = generator.generate(user_query, retrieved_docs)
+    answer = await generator.agenerate(user_query, retrieved_docs)
 
     is_no_answer = not answer or answer == "NO_ANSWER_FOUND"
     
@@ -1,11 +1,16 @@
 
+import asyncio
 import json
+import logging
+import os
 from travelstate import TravelState
 from prompts import DATE_EXTRACTION_PROMPT, QUERY_INTENT_AGENT_PROMPT, build_date_extraction_context, build_query_intent_context
-from utils import invoke_model, remove_markdown
+from utils import ainvoke_model, remove_markdown
 from langfuse.decorators import observe
 from langchain_core.messages import AIMessage
 
+logger = logging.getLogger(__name__)
+
 
 # Purpose:
 # This node analyzes the raw user query and identifies the *intent* of the user.
@@ -31,8 +36,32 @@ from langchain_core.messages import AIMessage
 #        - source_location  : Starting location of the trip
 
 
+# Per-branch timeouts for the two independent LLM calls
+QUERY_INTENT_TIMEOUT_S = float(os.getenv("QUERY_INTENT_TIMEOUT_S", "20"))
+DATE_EXTRACTION_TIMEOUT_S = float(os.getenv("DATE_EXTRACTION_TIMEOUT_S", "8"))
+
+
+async def extract_dates(llm, user_query: str) -> dict:
+    # Degrades to {} on timeout / bad output; ask_preference then asks for the dates
+    try:
+        date_extract_response = await asyncio.wait_for(
+            ainvoke_model(
+                model=llm,
+                systemMessage=DATE_EXTRACTION_PROMPT,
+                humanMessage=build_date_extraction_context(user_query)
+            ),
+            timeout=DATE_EXTRACTION_TIMEOUT_S,
+        )
+        date_info = json.loads(remove_markdown(date_extract_response))
+        return date_info if isinstance(date_info, dict) else {}
+
+    except Exception as e:
+        logger.warning("Date extraction degraded: %r", e)
+        return {}
+
+
 @observe(name="query_intent_node")
-def query_intent_node(state: TravelState, llm):
+async def query_intent_node(state: TravelState, llm):
     
     user_query = state.get("user_query", "")
     pdf_path = state.get("pdf_path", "")
@@ -41,24 +70,38 @@ def query_intent_node(state: TravelState, llm):
     # Human message
     context = build_query_intent_context(user_query, pdf_path, vector_created)
 
-    query_intent_response = invoke_model(
-        systemMessage=QUERY_INTENT_AGENT_PROMPT,
-        humanMessage=context
+    # Intent (70B) and date extraction (8B) are independent - run them together
+    intent_call = asyncio.wait_for(
+        ainvoke_model(
+            systemMessage=QUERY_INTENT_AGENT_PROMPT,
+            humanMessage=context
+        ),
+        timeout=QUERY_INTENT_TIMEOUT_S,
     )
-    context = build_date_extraction_context(user_query)
-
-    date_extract_response = invoke_model(
-        model=llm,
-        systemMessage=DATE_EXTRACTION_PROMPT,
-        humanMessage=context
+    intent_result, date_info = await asyncio.gather(
+        intent_call,
+        extract_dates(llm, user_query),
+        return_exceptions=True,
     )
-    
+
+    # gather may hand back a BaseException (e.g. CancelledError) that extract_dates can't catch
+    if not isinstance(date_info, dict):
+        date_info = {}
+
+    if isinstance(intent_result, asyncio.TimeoutError):
+        return {
+            "messages": [
+                AIMessage(content="Sorry, that took too long to understand. Please try again.")
+            ]
+        }
+    if isinstance(intent_result, BaseException):
+        raise intent_result
+
+    query_intent_response = intent_result
     content1 = remove_markdown(query_intent_response)
-    content2 = remove_markdown(date_extract_response)
 
     try:
         intent_info = json.loads(content1)
-        date_info = json.loads(content2)
         
     except json.JSONDecodeError:
         print()
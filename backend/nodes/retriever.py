@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from travelstate import TravelState
 from RAG.retriever import Retriever
@@ -15,49 +16,68 @@ from langfuse.decorators import observe
 # The PDF content is extracted using two methods:
 #   1. PdfReader (PyPDF) – Extracts embedded digital text from PDFs
 #   2. OCR (pytesseract) – Optical Character Recognition used as a fallback
-#      when the PDF contains scanned images instead of text
+#      for pages that contain scanned images instead of text (decided per page)
+# - Large PDFs are extracted page-parallel in a process pool, one rasterised page at a time
 # 
 # Chunking:
 # - Extracted text is split into manageable chunks using RecursiveCharacterTextSplitter
+# - Chunks stream out page by page with stable ids (document hash + page + offset);
+#   only chunks whose text was never embedded before go through the model
 # 
 # Embedding Model:
 # - Uses SentenceTransformerEmbeddings
 # - Model: "BAAI/bge-base-en-v1.5"
+# - Loaded once per worker (warmed at startup); concurrent encodes are micro-batched
 # 
 #  Vector Store:
 #  - Uses ChromaDB to store and manage document embeddings
+#  - One collection per document hash, so concurrent sessions never clear each other's index
+#  - Collections are leased while in use and evicted by TTL / LRU when cold
+# 
+# Ingestion Cache:
+# - Chunks and embeddings are cached on disk under "ingestion_cache",
+#   keyed by the PDF content hash + chunker settings + embedding model
+# - An unchanged PDF skips PyPDF / OCR, chunking and the embedding model entirely
 # 
 #  Retrieval Techniques:
-# - Lexical Search: BM25 retriever (keyword-based matching)
+# - Lexical Search: BM25 (keyword-based matching) over memory-mapped postings saved next to the collection
 # - Vector Search: Similarity-based retrieval using embeddings
+# - Fusion: weighted reciprocal-rank fusion, skipping a side when the other clearly dominates
+# - Query embeddings and results are cached per document (LRU + TTL) and dropped when its index changes
+# - Re-rank (off by default, RERANKER): the k fused candidates are re-scored against the query
+#   (cosine on cached chunk embeddings or a small cross-encoder) and only the best RERANK_TOP_N are kept
 #
 # Output:
 # - Returns the retrieved document chunks
 
 
+def retrieve_from_pdf(pdf_path: Path, user_query: str):
+    retriever = Retriever(
+        pdf_path=pdf_path,
+        embedding_model=get_embedding_model()
+    )
+
+    try:
+        retriever.initialize()
+        return retriever.retrieve(user_query)
+    finally:
+        retriever.close()
+
+
 @observe(name="retriever_node")
-def retriever_node(state: TravelState,llm):
+async def retriever_node(state: TravelState,llm):
     
     user_query = state.get("user_query", "")
     pdf_path = Path(state.get("pdf_path", ""))
     vector_created = state.get("vector_created", False)
-    flag = False
     
     if not vector_created:
         
-        flag = True
-        
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
-    retriever = Retriever(
-        pdf_path=pdf_path,
-        embedding_model=get_embedding_model()
-    )
-
-    retriever.initialize(rebuild=flag)
-
-    docs = retriever.retrieve(user_query)
+    # Ingestion / search is CPU and disk bound - keep it off the event loop
+    docs = await asyncio.to_thread(retrieve_from_pdf, pdf_path, user_query)
    
     return {
         "retrieved_docs": docs,
@@ -1,19 +1,20 @@
 import os
 from travelstate import TravelState
-from service import DistanceService, get_route, reverse_geocode
-from utils import correct_locations_with_llm, invoke_model
+from service import DistanceService, get_route, reverse_geocode_many
+from geometry import sample_every_km
+from utils import correct_locations_with_llm, ainvoke_model
 from langfuse.decorators import observe
 
 # Purpose:
 # 
 # - Geocodes both locations to coordinates
 # - Fetches a fixed driving route between source & destination
-# - Samples points along the route
+# - Samples points at fixed distances along the route
 # - Reverse-geocodes those points to nearby places
 # - Asks LLM to describe notable places strictly along this route
 
 @observe(name="route_description_node")
-def route_description_node(state: TravelState, llm):
+async def route_description_node(state: TravelState, llm):
 
     service = DistanceService(os.environ["GEOAPIFY_API_KEY"])
 
@@ -21,7 +22,7 @@ def route_description_node(state: TravelState, llm):
     agent_locations = state.get("agent_locations", {})
     destination_name = agent_locations.get("trip_planner")
 
-    corrected = correct_locations_with_llm(
+    corrected = await correct_locations_with_llm(
         llm=llm,
         source_name=source_name,
         destination_name=destination_name
@@ -31,8 +32,7 @@ def route_description_node(state: TravelState, llm):
     destination_name = corrected["destination"]
 
     # --- Geocoding ---
-    source = service.geocode(source_name)
-    dest = service.geocode(destination_name)
+    source, dest = await service.geocode_many([source_name, destination_name])
 
     if not source or not dest:
         raise Exception("Geocoding failed")
@@ -42,21 +42,23 @@ def route_description_node(state: TravelState, llm):
         [dest[1], dest[0]]
     ]
 
-    route_data = get_route(
+    route_data = await get_route(
         coordinates,
         os.environ["ORS_API_KEY"]
     )
 
-    geometry = route_data["geometry"]
-
-    step = max(1, len(geometry) // 8)
-    sample_points = geometry[::step]
+    # Evenly spaced by distance, not by vertex index
+    sample_points = [
+        (round(lat, 5), round(lon, 5))
+        for lat, lon in sample_every_km(route_data["geometry"]).tolist()
+    ]
 
     # latitude and longitude to place names
-    places_along_route = []
-    for lat, lon in sample_points:
-        place = reverse_geocode(lat,lon,os.environ["GEOAPIFY_API_KEY"])
-        places_along_route.append({"lat": lat,"lon": lon,"place_name": place})
+    place_names = await reverse_geocode_many(sample_points, os.environ["GEOAPIFY_API_KEY"])
+    places_along_route = [
+        {"lat": lat, "lon": lon, "place_name": place}
+        for (lat, lon), place in zip(sample_points, place_names)
+    ]
 
     context = f"""
         You are given a FIXED travel route. You MUST NOT change it.
@@ -77,7 +79,7 @@ def route_description_node(state: TravelState, llm):
         3. Say clearly if nothing notable exists
         """
 
-    response = invoke_model(model=llm, humanMessage=context)
+    response = await ainvoke_model(model=llm, humanMessage=context)
     agent_locations["trip_planner"] = destination_name
 
     return {
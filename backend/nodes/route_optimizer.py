@@ -1,26 +1,30 @@
 import json
+import logging
 import os
 from travelstate import TravelState
 from service import DistanceService
+from geo_cache import get_geocode_store
 from prompts import build_exact_places_context
-from utils import invoke_model, remove_markdown
+from utils import ainvoke_model, remove_markdown
 from langfuse.decorators import observe
 from langchain_core.messages import AIMessage
 
+logger = logging.getLogger(__name__)
+
 # Purpose:
 # 
 # - Extracts location names from the trip planner output
-# - Computes an optimized travel order for the extracted places using distance-based routing logic (nearest-neighbour)
+# - Computes an optimized travel order for the extracted places using distance-based routing logic (nearest-neighbour, then 2-opt / Or-opt)
 
 
 @observe(name="route_optimizer_node")
-def route_optimizer_node(state: TravelState, llm):
+async def route_optimizer_node(state: TravelState, llm):
     
     trip_plan = state.get("trip_planner_result", "")
 
     # Extract places using LLM 
     context = build_exact_places_context(trip_plan)
-    response = invoke_model(
+    response = await ainvoke_model(
         model=llm,
         systemMessage=(
             "You are a precise information extraction system. "
@@ -43,8 +47,20 @@ def route_optimizer_node(state: TravelState, llm):
     optimized_route = []
     if places:
         distance_service = DistanceService(os.environ["GEOAPIFY_API_KEY"])
-        optimized_places = distance_service.get_optimized_route(places)
+
+        # Start from the source city when the plan visits it
+        source = (state.get("source_location") or "").strip()
+        start = next((p for p in places if p.strip().lower() == source.lower()), None) if source else None
+
+        optimized_places, result = await distance_service.optimize_places(places, start=start)
         optimized_route = optimized_places
+        if result is not None:
+            logger.info(
+                "Route optimised: %.1f km -> %.1f km (%d places, %.1f ms)",
+                result.initial_km, result.optimized_km, len(result.order), result.elapsed_ms,
+            )
+            # Places were geocoded by now, so the store already exists and no SQLite is touched here
+            logger.info("Geocode cache: %s", get_geocode_store().stats())
     optimized_route_str = " → ".join(optimized_route)
 
     return {
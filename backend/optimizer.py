@@ -0,0 +1,185 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+# Local search stops after this long and keeps the best route found so far
+ROUTE_OPT_BUDGET_MS = float(os.getenv("ROUTE_OPT_BUDGET_MS", "50"))
+# Longest run of consecutive stops Or-opt tries to move
+OR_OPT_MAX_SEGMENT = 3
+
+# Only improvements larger than this count, so float noise can't cause endless swaps
+_EPS = 1e-9
+
+
+@dataclass
+class OptimizedRoute:
+    order: List[int]
+    initial_km: float
+    optimized_km: float
+    elapsed_ms: float
+    passes: int
+
+
+def route_km(order, matrix: np.ndarray) -> float:
+    # Legs to unresolved places (inf) are left out of the reported distance
+    order = np.asarray(order)
+    legs = matrix[order[:-1], order[1:]]
+    return float(legs[np.isfinite(legs)].sum())
+
+
+def nearest_neighbour_order(matrix: np.ndarray, start: int = 0, end: Optional[int] = None) -> List[int]:
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    if end is not None:
+        visited[end] = True
+
+    for _ in range(n - int(visited.sum())):
+        distances = np.where(visited, np.inf, matrix[order[-1]])
+        nearest = int(np.argmin(distances))
+
+        # Nothing reachable (unresolved place): keep the original order
+        if not np.isfinite(distances[nearest]):
+            nearest = int(np.flatnonzero(~visited)[0])
+
+        order.append(nearest)
+        visited[nearest] = True
+
+    if end is not None and end != start:
+        order.append(end)
+
+    return order
+
+
+def _two_opt(order: np.ndarray, d: np.ndarray, last: int, deadline: float) -> bool:
+    # Reverse order[i..j]; positions 0 and (with a fixed end) n-1 never move
+    n = len(order)
+    improved = False
+
+    for i in range(1, last):
+        js = np.arange(i + 1, last + 1)
+        a, b = order[i - 1], order[i]
+        c = order[js]
+
+        has_next = js + 1 < n
+        after_c = order[np.minimum(js + 1, n - 1)]
+
+        before = d[a, b] + np.where(has_next, d[c, after_c], 0.0)
+        after = d[a, c] + np.where(has_next, d[b, after_c], 0.0)
+        delta = after - before
+
+        k = int(np.argmin(delta))
+        if delta[k] < -_EPS:
+            j = int(js[k])
+            order[i : j + 1] = order[i : j + 1][::-1]
+            improved = True
+
+        if time.perf_counter() > deadline:
+            break
+
+    return improved
+
+
+def _or_opt(order: np.ndarray, d: np.ndarray, last: int, fixed_end: bool, deadline: float) -> bool:
+    # Move a run of 1..OR_OPT_MAX_SEGMENT stops (optionally reversed) to its cheapest gap
+    improved = False
+
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        i = 1
+        while i + length - 1 <= last:
+            n = len(order)
+            segment = order[i : i + length]
+            first, tail = segment[0], segment[-1]
+            prev = order[i - 1]
+            nxt = order[i + length] if i + length < n else None
+
+            removal_gain = d[prev, first] - (0.0 if nxt is None else d[prev, nxt] - d[tail, nxt])
+
+            rest = np.concatenate([order[:i], order[i + length :]])
+            u, v = rest[:-1], rest[1:]
+
+            forward = d[u, first] + d[tail, v] - d[u, v]
+            backward = d[u, tail] + d[first, v] - d[u, v]
+            gaps = np.minimum(forward, backward)
+            # Re-inserting where it came from isn't a move
+            if i - 1 < len(gaps):
+                gaps[i - 1] = np.inf
+
+            best_gap = int(np.argmin(gaps)) if len(gaps) else 0
+            best_cost = gaps[best_gap] if len(gaps) else np.inf
+
+            # Without a fixed end the run can also go last
+            append_cost = np.inf
+            if not fixed_end and nxt is not None:
+                append_cost = min(d[rest[-1], first], d[rest[-1], tail])
+
+            if min(best_cost, append_cost) - removal_gain < -_EPS:
+                if append_cost < best_cost:
+                    moved = segment if d[rest[-1], first] <= d[rest[-1], tail] else segment[::-1]
+                    order[:] = np.concatenate([rest, moved])
+                else:
+                    moved = segment if forward[best_gap] <= backward[best_gap] else segment[::-1]
+                    order[:] = np.concatenate([rest[: best_gap + 1], moved, rest[best_gap + 1 :]])
+                improved = True
+
+            if time.perf_counter() > deadline:
+                return improved
+            i += 1
+
+    return improved
+
+
+def optimize_route(
+    matrix: np.ndarray,
+    start: int = 0,
+    end: Optional[int] = None,
+    time_budget_ms: float = ROUTE_OPT_BUDGET_MS,
+) -> OptimizedRoute:
+    """
+    Shortest open route over a precomputed distance matrix.
+
+    - Greedy nearest-neighbour route as the starting point
+    - 2-opt (segment reversal) and Or-opt (segment relocation) until no move
+      helps or the time budget runs out
+    - start is always first; end, when given, is always last
+    """
+    began = time.perf_counter()
+    deadline = began + time_budget_ms / 1000
+
+    initial = nearest_neighbour_order(matrix, start, end)
+    initial_km = route_km(initial, matrix)
+
+    # Unresolved places are far but finite, so they drift to the end instead of producing inf - inf
+    finite = np.isfinite(matrix)
+    penalty = (matrix[finite].max() if finite.any() else 0.0) * len(matrix) + 1.0
+    d = np.where(finite, matrix, penalty)
+
+    order = np.array(initial)
+    fixed_end = end is not None and end != start
+    last = len(order) - 2 if fixed_end else len(order) - 1
+
+    passes = 0
+    if last >= 1:
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = _two_opt(order, d, last, deadline)
+            improved = _or_opt(order, d, last, fixed_end, deadline) or improved
+            passes += 1
+
+    optimized = [int(i) for i in order]
+    # Never hand back something worse than the greedy route
+    if route_km(optimized, d) > route_km(initial, d):
+        optimized = initial
+    optimized_km = route_km(optimized, matrix)
+
+    return OptimizedRoute(
+        order=optimized,
+        initial_km=initial_km,
+        optimized_km=optimized_km,
+        elapsed_ms=(time.perf_counter() - began) * 1000,
+        passes=passes,
+    )
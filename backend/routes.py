@@ -1,6 +1,5 @@
 from travelstate import TravelState
 from langgraph.graph import END
-from langchain_core.messages import ToolMessage 
 
 AGENT_META = {
     "research_agent": {
@@ -22,6 +21,15 @@ AGENT_META = {
 }
 
 
+# Agents that run as parallel branches next to the research / trip planning chain,
+# each with the agents whose output it reads. general_assistant uses the pdf_data and
+# needs_general_fallback written by generator, so with research pending it runs after it.
+PARALLEL_AGENTS = {
+    "weather_analyst": (),
+    "general_assistant": ("research_agent",),
+}
+
+
 def route_after_query_intent(state: TravelState):
     agents = state.get("agents_needed", [])
     query_type = state.get("query_type", "")
@@ -29,20 +37,23 @@ def route_after_query_intent(state: TravelState):
     if not agents or query_type == "invalid":
         return END
 
-    pending = []
-    for agent in agents:
-        if agent in AGENT_META:
-            complete_flag = AGENT_META[agent]["complete_flag"]
-            if not state.get(complete_flag, False):
-                pending.append(agent)
-    
+    pending = get_pending_agents(state)
     if not pending:
         return END
-    
-    if "research_agent" in pending and "trip_planner" in pending:
-        return "retriever"
-    
-    return AGENT_META[pending[0]]["node_name"]
+
+    # Fan out: every pending agent starts in this step; synthesizer waits for all of them
+    destinations = [
+        AGENT_META[agent]["node_name"]
+        for agent, depends_on in PARALLEL_AGENTS.items()
+        if agent in pending and not any(dep in pending for dep in depends_on)
+    ]
+
+    if "research_agent" in pending:
+        destinations.append("retriever")
+    elif "trip_planner" in pending:
+        destinations.append("ask_preference")
+
+    return destinations
 
 def route_after_generator(state: TravelState):
     needs_fallback = state.get("needs_general_fallback", False)
@@ -73,47 +84,14 @@ def get_pending_agents(state: TravelState):
 
 
 def should_continue_to_tools(state: TravelState):
+    # Only trip_planner uses the shared "tools" node; parallel agents run their own tool loop
     messages = state.get("messages", [])
 
-    if not messages:
-        pending = get_pending_agents(state)
-        if pending:
-            return AGENT_META[pending[0]]["node_name"]
-        return "synthesizer"
-
-    last_message = messages[-1]
+    last_message = messages[-1] if messages else None
     if hasattr(last_message, "tool_calls") and last_message.tool_calls:
         return "tools"
-    
-    if isinstance(last_message, ToolMessage):
-        last_agent = state.get("last_active_agent")
-        if last_agent:
-            return last_agent
-
-    pending = get_pending_agents(state)
-    if pending:
-        return AGENT_META[pending[0]]["node_name"]
 
     if state.get("trip_planner_called"):
         return "route_optimizer"
 
     return "synthesizer"
-
-
-
-def route_after_tools(state: TravelState):
-    last_agent = state.get("last_active_agent")
-    
-    if last_agent == "trip_planner":
-        return "trip_planner"
-    elif last_agent == "weather_analyst":
-        return "weather_analyst"
-    elif last_agent == "general_assistant":
-        return "general_assistant"
-    
-    pending = get_pending_agents(state)
-    if pending:
-        return AGENT_META[pending[0]]["node_name"]
-    
-    return "synthesizer"
-
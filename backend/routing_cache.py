@@ -0,0 +1,42 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from ttl_cache import TTLCache
+
+# Routing results by travel mode + rounded waypoints; ~110 m rounding at 3 decimals
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "1024"))
+ROUTE_CACHE_TTL_SECONDS = float(os.getenv("ROUTE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+ROUTE_CACHE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "3"))
+
+
+@dataclass(frozen=True)
+class CachedRoute:
+    distance_km: float
+    duration_min: float
+    steps: tuple
+    geometry: np.ndarray  # (N, 2) float32 lat/lon
+
+
+def route_key(coordinates: list, precision: int = ROUTE_CACHE_PRECISION) -> tuple:
+    return tuple((round(lon, precision), round(lat, precision)) for lon, lat in coordinates)
+
+
+class RouteCache(TTLCache):
+    """
+    In-memory routing results, scoped by travel mode. Geometry is held as
+    one float32 array per route rather than a list of Python tuples.
+    """
+
+    def __init__(self, maxsize: int = ROUTE_CACHE_SIZE, ttl: float = ROUTE_CACHE_TTL_SECONDS):
+        super().__init__(maxsize, ttl)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["geometry_bytes"] = sum(route.geometry.nbytes for _, route in self._data.values())
+        return stats
+
+
+route_cache = RouteCache()
@@ -1,112 +1,187 @@
-import requests
+import asyncio
+import logging
+import os
 import polyline
-from typing import List
-import math
+from typing import List, Optional, Tuple
+import numpy as np
+from http_client import provider_request
+from geo_cache import get_geocode_store, get_reverse_geocode_store
+from routing_cache import CachedRoute, route_cache, route_key
+from optimizer import OptimizedRoute, optimize_route
+from geometry import EARTH_RADIUS_KM, compact, simplify
+
+logger = logging.getLogger(__name__)
+
+GEOAPIFY_GEOCODE_URL = "https://api.geoapify.com/v1/geocode/search"
+GEOAPIFY_REVERSE_URL = "https://api.geoapify.com/v1/geocode/reverse"
+GEOAPIFY_BATCH_URL = "https://api.geoapify.com/v1/batch/geocode/{kind}"
+
+UNKNOWN_LOCATION = "Unknown location"
+
+# Inputs (after dedupe and cache) from which the batch endpoint is used instead of concurrent single calls
+GEOAPIFY_BATCH_MIN = int(os.getenv("GEOAPIFY_BATCH_MIN", "25"))
+GEOAPIFY_BATCH_POLL_S = float(os.getenv("GEOAPIFY_BATCH_POLL_S", "1"))
+GEOAPIFY_BATCH_TIMEOUT_S = float(os.getenv("GEOAPIFY_BATCH_TIMEOUT_S", "30"))
 
 class DistanceService:
     def __init__(self, geoapify_key: str):
         self.api_key = geoapify_key
-        self._geo_cache = {}       # place -> (lat, lon)
-        self._distance_cache = {}  # (placeA, placeB) -> km
 
-    def geocode(self, place: str):
+    async def geocode(self, place: str):
+        return (await self.geocode_many([place]))[0]
 
-        if place in self._geo_cache:
-            return self._geo_cache[place]
-
-        url = "https://api.geoapify.com/v1/geocode/search"
+    async def _fetch_geocode(self, place: str):
         params = {"text": place, "apiKey": self.api_key}
 
-        r = requests.get(url, params=params).json()
-        
+        response = await provider_request(
+            "geoapify", "GET", GEOAPIFY_GEOCODE_URL, rate_key=self.api_key, params=params
+        )
+        # Only a successful empty answer is a real "not found"; errors are retried next time
+        response.raise_for_status()
+        r = response.json()
+
         if not r.get("features"):
             return None
 
         lon, lat = r["features"][0]["geometry"]["coordinates"]
-        self._geo_cache[place] = (lat, lon)
         return lat, lon
 
-    def haversine_km(self, lat1, lon1, lat2, lon2):
-        R = 6371.0  # Earth radius in km
-
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-
-        d_phi = math.radians(lat2 - lat1)
-        d_lambda = math.radians(lon2 - lon1)
-
-        a = (
-            math.sin(d_phi / 2) ** 2
-            + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    # BULK GEOCODING: dedupe -> cache -> batch endpoint or bounded concurrent lookups
+    async def geocode_many(self, places: List[str]) -> List[Optional[Tuple[float, float]]]:
+        unique = list(dict.fromkeys(p.strip() for p in places))
+
+        # place -> (lat, lon), shared by every instance. The store is SQLite-backed,
+        # so it is read and written in one batch each, off the event loop.
+        store = await asyncio.to_thread(get_geocode_store)
+        resolved = await asyncio.to_thread(store.get_many, unique)
+        missing = [place for place in unique if place not in resolved]
+        fetched = {}
+
+        if len(missing) >= GEOAPIFY_BATCH_MIN:
+            rows = await geoapify_batch("search", missing, self.api_key)
+            if rows is not None:
+                for place, row in zip(missing, rows):
+                    fetched[place] = (row["lat"], row["lon"]) if row.get("lat") is not None else None
+                missing = []
+
+        if missing:
+            results = await asyncio.gather(
+                *(self._fetch_geocode(place) for place in missing),
+                return_exceptions=True,
+            )
+            for place, result in zip(missing, results):
+                if isinstance(result, BaseException):
+                    # Failed lookups aren't cached
+                    logger.warning("Geocoding %r failed: %r", place, result)
+                    resolved[place] = None
+                else:
+                    fetched[place] = result
+
+        if fetched:
+            await asyncio.to_thread(store.set_many, fetched)
+        resolved.update(fetched)
+
+        logger.debug("Geocode cache: %s", store.stats())
+
+        return [resolved[p.strip()] for p in places]
+
+    # (N, 2) lat/lon array, NaN where a place can't be resolved
+    async def geocode_places(self, places: List[str]) -> np.ndarray:
+        results = await self.geocode_many(places)
+
+        return np.array(
+            [coords or (np.nan, np.nan) for coords in results],
+            dtype=np.float64,
+        ).reshape(len(places), 2)
+
+    # ALL PAIRWISE DISTANCES IN ONE PASS
+    async def distance_matrix(self, places: List[str]) -> np.ndarray:
+        return haversine_matrix(await self.geocode_places(places))
+
+    # ROUTE OPTIMIZATION (greedy start + 2-opt / Or-opt on the matrix)
+    async def optimize_places(
+        self,
+        places: List[str],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[OptimizedRoute]]:
+        # start / end (source city, hotel) are pinned to the ends of the route;
+        # without a start the first place stays first, as before
+        places = list(dict.fromkeys(p.strip() for p in places))
+        for fixed in (start, end):
+            if fixed and fixed.strip() not in places:
+                places.append(fixed.strip())
+
+        if len(places) <= 1 or (len(places) == 2 and not (start or end)):
+            return places, None
+
+        matrix = await self.distance_matrix(places)
+        result = optimize_route(
+            matrix,
+            start=places.index(start.strip()) if start else 0,
+            end=places.index(end.strip()) if end else None,
         )
+        return [places[i] for i in result.order], result
+
+    async def get_optimized_route(
+        self,
+        places: List[str],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[str]:
+        route, _ = await self.optimize_places(places, start=start, end=end)
+        return route
 
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
-
-
-    # STRAIGHT-LINE (HAVERSINE) DISTANCE
-    def driving_distance(self, origin: str, destination: str) -> float | None:
-        key = tuple(sorted((origin, destination)))
-        if key in self._distance_cache:
-            return self._distance_cache[key]
-
-        o = self.geocode(origin)
-        d = self.geocode(destination)
-
-        if not o or not d:
-            return None
-
-        lat1, lon1 = o[1], o[0]
-        lat2, lon2 = d[1], d[0]
-
-        km = self.haversine_km(lat1, lon1, lat2, lon2)
-        self._distance_cache[key] = km
-        return km
 
-    # PRECOMPUTE ALL DISTANCES
-    def _build_distance_matrix(self, places: List[str]):
-        for i in range(len(places)):
-            for j in range(i + 1, len(places)):
-                self.driving_distance(places[i], places[j])
+def haversine_matrix(coordinates: np.ndarray) -> np.ndarray:
+    # coordinates: (N, 2) lat/lon in degrees. Unresolved (NaN) rows are infinitely far away.
+    lat = np.radians(coordinates[:, 0])
+    lon = np.radians(coordinates[:, 1])
 
-    # NEAREST NEIGHBOUR OPTIMIZATION
-    def get_optimized_route(self, places: List[str]) -> List[str]:
-        if len(places) <= 2:
-            return places
+    d_phi = lat[:, None] - lat[None, :]
+    d_lambda = lon[:, None] - lon[None, :]
 
-        # Precompute all pairwise distances once
-        self._build_distance_matrix(places)
+    a = (
+        np.sin(d_phi / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(d_lambda / 2) ** 2
+    )
+    matrix = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
 
-        remaining = [p.strip() for p in places]
-        route = [remaining.pop(0)]
+    matrix[np.isnan(matrix)] = np.inf
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
 
-        while remaining:
-            current = route[-1]
 
-            nearest_place = None
-            nearest_distance = float("inf")
+def decode_geometry(geometry) -> np.ndarray:
+    # Encoded polyline or GeoJSON (Multi)LineString -> (N, 2) float32 lat/lon
+    if isinstance(geometry, str):
+        return compact(polyline.decode(geometry))
 
-            for place in remaining:
-                key = tuple(sorted((current, place)))
-                distance = self._distance_cache.get(key, float("inf"))
+    coords = geometry.get("coordinates", [])
+    if geometry.get("type") == "MultiLineString":
+        coords = [point for line in coords for point in line]
+    return compact(coords)[:, ::-1].copy()
 
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_place = place
 
-            if nearest_place is None:
-                nearest_place = remaining[0]
-            
-            route.append(nearest_place)
-            remaining.remove(nearest_place)
+def route_response(route: CachedRoute, max_distance_km: float) -> dict:
+    geometry = route.geometry
+    if route.distance_km > max_distance_km and len(geometry) > 2:
+        geometry = geometry[[0, -1]]
 
-        return route
+    return {
+        "distance_km": route.distance_km,
+        "duration_min": route.duration_min,
+        "steps": [dict(step) for step in route.steps],
+        # float32 keeps ~1 m precision; round so callers don't see 12.899999618
+        "geometry": [tuple(point) for point in np.round(geometry.astype(np.float64), 5).tolist()]
+    }
 
 
-def get_route(
+async def get_route(
     coordinates: list,
     api_key: str,
-    max_distance_km: float = 500
+    max_distance_km: float = 500,
+    mode: str = "drive"
 ):
 
     if len(coordinates) < 2:
@@ -119,7 +194,18 @@ def get_route(
 
     start_lon, start_lat = coordinates[0]
     end_lon, end_lat = coordinates[-1]
-    fallback_geometry = [(start_lat, start_lon), (end_lat, end_lon)]
+    fallback = {
+        "distance_km": 0,
+        "duration_min": 0,
+        "steps": [],
+        "geometry": [(start_lat, start_lon), (end_lat, end_lon)]
+    }
+
+    # Same city pair (to ~100 m) and mode -> no routing call
+    key = route_key(coordinates)
+    cached = route_cache.get(mode, key)
+    if cached is not None:
+        return route_response(cached, max_distance_km)
 
     waypoints = "|".join(
         f"{lat},{lon}" for lon, lat in coordinates
@@ -128,31 +214,21 @@ def get_route(
     url = "https://api.geoapify.com/v1/routing"
     params = {
         "waypoints": waypoints,
-        "mode": "drive",
+        "mode": mode,
         "details": "instruction_details",
         "apiKey": api_key
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = await provider_request("geoapify", "GET", url, rate_key=api_key, params=params)
 
         if response.status_code != 200:
-            return {
-                "distance_km": 0,
-                "duration_min": 0,
-                "steps": [],
-                "geometry": fallback_geometry
-            }
+            return fallback
 
         data = response.json()
 
         if not data.get("features"):
-            return {
-                "distance_km": 0,
-                "duration_min": 0,
-                "steps": [],
-                "geometry": fallback_geometry
-            }
+            return fallback
 
         route = data["features"][0]
         props = route["properties"]
@@ -160,17 +236,6 @@ def get_route(
         distance_m = props.get("distance", 0)
         duration_s = props.get("time", 0)
 
-        distance_km = distance_m / 1000
-        duration_min = duration_s / 60
-
-        decoded_coords = polyline.decode(route["geometry"])
-
-        geometry = (
-            [decoded_coords[0], decoded_coords[-1]]
-            if distance_km > max_distance_km
-            else decoded_coords
-        )
-
         steps = []
         legs = props.get("legs", [])
         if legs:
@@ -181,39 +246,124 @@ def get_route(
                     "duration_s": step.get("time")
                 })
 
-        return {
-            "distance_km": distance_km,
-            "duration_min": duration_min,
-            "steps": steps,
-            "geometry": geometry
-        }
+        result = CachedRoute(
+            distance_km=distance_m / 1000,
+            duration_min=duration_s / 60,
+            steps=tuple(steps),
+            # Stored simplified: a fraction of the vertices, same shape to within ~50 m
+            geometry=simplify(decode_geometry(route["geometry"])),
+        )
 
     except Exception:
-        return {
-            "distance_km": 0,
-            "duration_min": 0,
-            "steps": [],
-            "geometry": fallback_geometry
-        }
+        return fallback
+
+    route_cache.set(mode, key, result)
+    logger.debug("Route cache: %s", route_cache.stats())
+    return route_response(result, max_distance_km)
 
 # REVERSE GEOCODING 
-def reverse_geocode(lat, lon, api_key):
-    r = requests.get(
-        "https://api.geoapify.com/v1/geocode/reverse",
+def place_name(props: dict) -> str:
+    return (
+        props.get("city")
+        or props.get("town")
+        or props.get("village")
+        or props.get("formatted")
+        or UNKNOWN_LOCATION
+    )
+
+
+async def reverse_geocode(lat, lon, api_key):
+    r = (await provider_request(
+        "geoapify",
+        "GET",
+        GEOAPIFY_REVERSE_URL,
+        rate_key=api_key,
         params={
             "lat": lat,
             "lon": lon,
             "apiKey": api_key
         }
-    ).json()
+    )).json()
 
     if not r.get("features"):
-        return "Unknown location"
+        return UNKNOWN_LOCATION
 
-    props = r["features"][0]["properties"]
-    return (
-        props.get("city")
-        or props.get("town")
-        or props.get("village")
-        or props.get("formatted")
+    return place_name(r["features"][0]["properties"])
+
+
+async def reverse_geocode_many(points: List[Tuple[float, float]], api_key: str) -> List[str]:
+    # Points closer than ~1 m share one lookup
+    keys = [(round(lat, 5), round(lon, 5)) for lat, lon in points]
+    unique = list(dict.fromkeys(keys))
+
+    # Anything near an already-known point is answered from the spatial cache.
+    # The store is SQLite-backed, so it is read and written in one batch each, off the event loop.
+    store = await asyncio.to_thread(get_reverse_geocode_store)
+    cached = await asyncio.to_thread(store.get_many, unique)
+    names = {key: name for key, name in zip(unique, cached) if name is not None}
+
+    missing = [key for key in unique if key not in names]
+    fetched = {}
+
+    if len(missing) >= GEOAPIFY_BATCH_MIN:
+        rows = await geoapify_batch(
+            "reverse", [{"lat": lat, "lon": lon} for lat, lon in missing], api_key
+        )
+        if rows is not None:
+            fetched = {key: place_name(row) for key, row in zip(missing, rows)}
+
+    pending = [key for key in missing if key not in fetched]
+    results = await asyncio.gather(
+        *(reverse_geocode(lat, lon, api_key) for lat, lon in pending),
+        return_exceptions=True,
     )
+    for key, result in zip(pending, results):
+        if isinstance(result, BaseException):
+            logger.warning("Reverse geocoding %s failed: %r", key, result)
+            result = UNKNOWN_LOCATION
+        fetched[key] = result
+
+    known = [(*key, name) for key, name in fetched.items() if name != UNKNOWN_LOCATION]
+    if known:
+        await asyncio.to_thread(store.set_many, known)
+    names.update(fetched)
+
+    logger.debug("Reverse geocode cache: %s", store.stats())
+    return [names[key] for key in keys]
+
+
+# Geoapify batch jobs: submit once, poll until the results are ready.
+# Cheaper per lookup, but only worth the polling latency for larger inputs.
+async def geoapify_batch(kind: str, inputs: list, api_key: str) -> Optional[list]:
+    url = GEOAPIFY_BATCH_URL.format(kind=kind)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + GEOAPIFY_BATCH_TIMEOUT_S
+
+    try:
+        response = await provider_request(
+            "geoapify", "POST", url, rate_key=api_key, params={"apiKey": api_key}, json=inputs
+        )
+        if response.status_code == 200:
+            rows = response.json()
+        elif response.status_code == 202:
+            job_id = response.json().get("id")
+            rows = None
+            while rows is None and loop.time() < deadline:
+                await asyncio.sleep(GEOAPIFY_BATCH_POLL_S)
+                response = await provider_request(
+                    "geoapify", "GET", url, rate_key=api_key, params={"id": job_id, "apiKey": api_key}
+                )
+                if response.status_code == 200:
+                    rows = response.json()
+                elif response.status_code != 202:
+                    break
+        else:
+            rows = None
+    except Exception as e:
+        logger.warning("Geoapify batch %s failed: %r", kind, e)
+        return None
+
+    # Results come back in input order; anything else falls back to single lookups
+    if not isinstance(rows, list) or len(rows) != len(inputs):
+        return None
+    return [row if isinstance(row, dict) else {} for row in rows]
@@ -1,22 +1,46 @@
+import asyncio
 import os
 from langchain_core.tools import tool
-from langchain_community.utilities import OpenWeatherMapAPIWrapper
-from tavily import TavilyClient
+from http_client import provider_request
 from dotenv import load_dotenv
 
 load_dotenv()
 
-import os
-from langchain_core.tools import tool
-from langchain_community.utilities import OpenWeatherMapAPIWrapper
-from tavily import TavilyClient
-from dotenv import load_dotenv
-
-load_dotenv()
+OPENWEATHERMAP_URL = "https://api.openweathermap.org/data/2.5/weather"
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# Tool calls from one AIMessage run concurrently (ToolNode gathers them).
+# Each provider is bounded separately (http_client.PROVIDERS); this caps one
+# tool call including retries, so a slow provider only costs its own calls,
+# which come back as an error string
+TOOL_TIMEOUT_S = float(os.getenv("TOOL_TIMEOUT_S", "15"))
+
+
+def format_weather(city: str, data: dict) -> str:
+    # Same layout as OpenWeatherMapAPIWrapper.run, which the agents' prompts were written against
+    main = data.get("main", {})
+    wind = data.get("wind", {})
+    weather = (data.get("weather") or [{}])[0]
+    rain = data.get("rain", {})
+
+    return (
+        f"In {city}, the current weather is as follows:\n"
+        f"Detailed status: {weather.get('description', 'unknown')}\n"
+        f"Wind speed: {wind.get('speed')} m/s, direction: {wind.get('deg')}°\n"
+        f"Humidity: {main.get('humidity')}%\n"
+        f"Temperature: \n"
+        f"  - Current: {main.get('temp')}°C\n"
+        f"  - High: {main.get('temp_max')}°C\n"
+        f"  - Low: {main.get('temp_min')}°C\n"
+        f"  - Feels like: {main.get('feels_like')}°C\n"
+        f"Rain: {rain}\n"
+        f"Heat index: None\n"
+        f"Cloud cover: {data.get('clouds', {}).get('all')}%"
+    )
 
 
 @tool
-def get_weather(city: str) -> str:
+async def get_weather(city: str) -> str:
     """
     Get current weather information for a city.
 
@@ -31,15 +55,26 @@ def get_weather(city: str) -> str:
         return f"API key missing. Can't get weather for {city}."
 
     try:
-        weather_api = OpenWeatherMapAPIWrapper(openweathermap_api_key=api_key)
-        result = weather_api.run(city)
-        return result
+        response = await asyncio.wait_for(
+            provider_request(
+                "openweathermap",
+                "GET",
+                OPENWEATHERMAP_URL,
+                rate_key=api_key,
+                params={"q": city, "appid": api_key, "units": "metric"},
+            ),
+            timeout=TOOL_TIMEOUT_S,
+        )
+        response.raise_for_status()
+        return format_weather(city, response.json())
+    except asyncio.TimeoutError:
+        return f"Weather service timed out for {city}."
     except Exception as e:
         return f"Error fetching weather for {city}: {str(e)}"
 
 
 @tool
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """
     Search the web and return results.
 
@@ -54,9 +89,19 @@ def web_search(query: str) -> str:
         return "Tavily API key missing. Please set TAVILY_API_KEY."
 
     try:
-        client = TavilyClient(api_key=api_key)
-        results = client.search(query=query, max_results=5, include_answer=True, search_depth="basic")
-
+        response = await asyncio.wait_for(
+            provider_request(
+                "tavily",
+                "POST",
+                TAVILY_SEARCH_URL,
+                rate_key=api_key,
+                headers={"Authorization": f"Bearer {api_key}"},
+                json={"query": query, "max_results": 5, "include_answer": True, "search_depth": "basic"},
+            ),
+            timeout=TOOL_TIMEOUT_S,
+        )
+        response.raise_for_status()
+        results = response.json()
 
         if not results.get("results"):
             return f"No results found for: {query}"
@@ -67,5 +112,7 @@ def web_search(query: str) -> str:
             formatted += f"   {r.get('content', '')[:]}...\n"
         return formatted
 
+    except asyncio.TimeoutError:
+        return f"Web search timed out for: {query}"
     except Exception as e:
         return f"Web search error: {str(e)}"
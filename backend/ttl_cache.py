@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after ttl seconds.
+    Keys are (scope, key) pairs so a whole scope can be dropped at once.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, key: Hashable) -> Optional[Any]:
+        full_key = (scope, key)
+        with self._lock:
+            entry = self._data.get(full_key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[full_key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(full_key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, scope: str, key: Hashable, value: Any):
+        full_key = (scope, key)
+        with self._lock:
+            self._data[full_key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, scope: str) -> int:
+        with self._lock:
+            stale = [k for k in self._data if k[0] == scope]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+            }
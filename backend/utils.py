@@ -7,7 +7,7 @@ from datetime import date
 from typing import Optional
 from dateutil import parser
 from langgraph.types import interrupt
-from models import invoke_llm
+from models import ainvoke_llm, invoke_llm
 
 
 def invoke_model(model=None, systemMessage: str = "", humanMessage: str = ""):
@@ -21,6 +21,18 @@ def invoke_model(model=None, systemMessage: str = "", humanMessage: str = ""):
 
     return invoke_llm(messages_to_llm)
 
+
+async def ainvoke_model(model=None, systemMessage: str = "", humanMessage: str = ""):
+    messages_to_llm = [
+        SystemMessage(content=systemMessage),
+        HumanMessage(content=humanMessage),
+    ]
+
+    if model is not None:
+        return await model.ainvoke(messages_to_llm)
+
+    return await ainvoke_llm(messages_to_llm)
+
 def remove_markdown(response):
   
     content = response.content.strip()
@@ -48,7 +60,7 @@ def parse_date(value: Optional[str]) -> Optional[date]:
     except Exception:
         return None
 
-def correct_locations_with_llm(
+async def correct_locations_with_llm(
     llm,
     source_name: str | None,
     destination_name: str | None
@@ -84,7 +96,7 @@ OUTPUT FORMAT (exactly):
 }}
 """
 
-    response = invoke_model(model=llm, humanMessage=context)
+    response = await ainvoke_model(model=llm, humanMessage=context)
     response = remove_markdown(response=response)
 
     try:
@@ -152,7 +164,7 @@ def handle_date_update(update, from_date, to_date):
         update["month"] = derive_month(from_date, to_date)
 
         
-def is_greeting_via_llm(llm, user_query: str) -> bool:
+async def is_greeting_via_llm(llm, user_query: str) -> bool:
 
     
     GREETING_CLASSIFIER_PROMPT = """
@@ -170,7 +182,7 @@ def is_greeting_via_llm(llm, user_query: str) -> bool:
     Reply with only one word.
     """
 
-    response = invoke_model(
+    response = await ainvoke_model(
         model=llm,
         systemMessage=GREETING_CLASSIFIER_PROMPT,
         humanMessage=user_query